@@ -19,48 +19,136 @@ os.chdir(cwd)
 if cwd not in sys.path:
     sys.path.append(cwd)
 
-# Fix for QDialog import if needed or just use PySide6 direct
-from PySide6.QtWidgets import QDialog
 
-from src.utils.helpers import load_config
-from src.gui import ui_init, MainWindow
-from src.gui.binder import AgentBinder
-from src.live2d import live2d
-from src.network_client import NetworkClient
-from src.gui.login_dialog import LoginDialog
+def import_app_modules():
+    # 主窗口和调度层会加载 PyOpenGL、聊天视图等，只在确定要进入主窗口时于主线程导入，
+    # 不与原生模块的初始化并发；手动登录时对话框不必等这些导入
+    from src.gui.main_ui import MainWindow
+    from src.gui.binder import AgentBinder
+    return MainWindow, AgentBinder
+
+
+def preload_live2d(live2d_config):
+    from src.live2d.asset_preloader import preload_model_assets
+    preload_model_assets(live2d_config).wait()
+
+
+def spawn_audio_worker(audio_worker_config):
+    from src.utils.audio_worker import AudioWorker
+    return AudioWorker(audio_worker_config).start()
+
+
+def on_event_loop_started(trace, import_profiler):
+    trace.mark("event_loop_started")
+    trace.print_report()
+    if import_profiler is not None:
+        import_profiler.uninstall()
+        print(f"Import profile written to {import_profiler.write_report()}")
+
 
 if __name__ == "__main__":
     # Windows multiprocessing support for PyInstaller
+    # 冻结程序中的播放子进程会在这里接管并退出；普通 spawn 的子进程以 __mp_main__ 导入本模块，
+    # 不会执行这个分支。两种情况下子进程都不导入下面的界面和网络模块
     multiprocessing.freeze_support()
+
+    import_profiler = None
+    if "--import-profile" in sys.argv:
+        # 只依赖标准库，在导入 PySide6 之前安装，报告覆盖进程中的全部导入
+        from src.import_profiler import ImportProfiler
+        import_profiler = ImportProfiler().install()
+
+    # Fix for QDialog import if needed or just use PySide6 direct
+    from PySide6.QtWidgets import QDialog
+    from PySide6.QtCore import QTimer
+
+    from src.startup import StartupOrchestrator, StartupTrace
+
+    # 尽早开始计时，包含下面这些模块的导入时间
+    trace = StartupTrace(enabled="--startup-trace" in sys.argv)
+    # 这里只导入登录之前用到的轻量模块；主窗口、Live2D 等重模块在 ui_init 之后导入
+    with trace.stage("imports"):
+        from src.utils.helpers import load_config
+        from src.utils.history_cache import HistoryCache
+        from src.gui import ui_init
+        from src.network_client import NetworkClient
+        from src.gui.login_dialog import LoginDialog, attempt_auto_login
+        from src.safety import credential, encrypt_pwd
+
     main_config_path = os.path.join(cwd, "config", "config.json")
     if not os.path.exists(main_config_path):
         print(f"Config not found at {main_config_path}")
 
-    config = load_config(main_config_path)
-
-    app = ui_init()
+    with trace.stage("load_config"):
+        config = load_config(main_config_path)
 
-    # Login Flow
+    # 线程池只执行 I/O 步骤（网络请求、读文件），与界面初始化和登录并行；
+    # 涉及原生模块的导入和初始化都留在主线程
+    startup = StartupOrchestrator(trace)
     network_client = NetworkClient(base_url=config.get("base_url"))
-    login_dialog = LoginDialog(network_client)
+    history_cache_config = config.get("history_cache") or {}
+    saved_credentials = credential.load_credentials()
+    can_auto_login = bool(saved_credentials and saved_credentials[1] and saved_credentials[2])
+    history_cache = HistoryCache(
+        cache_dir=history_cache_config.get("cache_dir", "temp/history_cache"),
+        user_id=saved_credentials[0] if saved_credentials else None,
+    )
+    # 播放进程最先启动，设备初始化在子进程中与登录并行完成，第一句回复不必等冷启动
+    with trace.stage("audio_worker_spawn"):
+        audio_worker = spawn_audio_worker(config.get("audio_worker"))
+    auto_login_future = startup.submit("auto_login", attempt_auto_login, network_client)
+    if not can_auto_login:
+        # 不会自动登录时才需要公钥加密密码
+        startup.submit("public_key_prefetch", encrypt_pwd.get_public_key, network_client.base_url)
+    startup.submit("history_cache_read", history_cache.load)
+
+    with trace.stage("ui_init"):
+        app = ui_init(config.get("live2d", {}).get("render"))
+
+    # ui_init 已在主线程导入 src.live2d，预加载线程只读取配置和资源文件
+    startup.submit("live2d_preload", preload_live2d, config["live2d"])
 
-    # Try auto login
-    if not login_dialog.try_auto_login():
-        if login_dialog.exec() != QDialog.DialogCode.Accepted:
-            live2d.dispose()
-            sys.exit(0)
+    from src.live2d import live2d
+
+    app_modules = None
+    if can_auto_login:
+        # 自动登录的请求正在进行，趁等待结果导入主窗口模块
+        with trace.stage("import_app_modules"):
+            app_modules = import_app_modules()
+
+    # Login Flow
+    with trace.stage("login"):
+        if not auto_login_future.result():
+            login_dialog = LoginDialog(network_client)
+            if login_dialog.exec() != QDialog.DialogCode.Accepted:
+                live2d.dispose()
+                sys.exit(0)
 
     print(f"Logged in as {network_client.user_id}")
+    if history_cache.user_id != network_client.user_id:
+        # 登录的不是凭据中保存的用户，预读的缓存作废
+        history_cache = HistoryCache(cache_dir=history_cache.cache_dir, user_id=network_client.user_id)
+        history_cache.load()
+
+    if app_modules is None:
+        with trace.stage("import_app_modules"):
+            app_modules = import_app_modules()
+    MainWindow, AgentBinder = app_modules
 
     binder = AgentBinder(
         hear_callback=network_client.network_hear_callback,
         hear_picture_callback=network_client.network_hear_picture_callback,
         history_callback=network_client.network_history_callback,
+        audio_cache_config=config.get("audio_cache"),
+        turn_queue_config=config.get("turn_queue"),
+        audio_worker=audio_worker,
+        history_cache=history_cache,
     )
 
     try:
-        window = MainWindow(config["gui"], config["live2d"], binder)
-        window.show()
+        with trace.stage("main_window"):
+            window = MainWindow(config["gui"], config["live2d"], binder)
+            window.show()
     except Exception as e:
         print(f"Error creating MainWindow: {e}")
         import traceback
@@ -69,6 +157,11 @@ if __name__ == "__main__":
         live2d.dispose()
         sys.exit(1)
 
+    startup.shutdown()
+    # 事件循环处理完第一批事件（首帧）之后输出时间线
+    QTimer.singleShot(0, lambda: on_event_loop_started(trace, import_profiler))
+
     ret = app.exec()
+    binder.shutdown()
     live2d.dispose()
     sys.exit(ret)
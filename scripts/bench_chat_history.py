@@ -0,0 +1,150 @@
+"""
+聊天记录视图基准测试
+
+在 Qt offscreen 平台上向 ChatListView 加载 10k 条消息，测量插入、首次布局、
+滚动重绘、改变宽度后重新布局、顶部插入一页的耗时，以及进程内存的增长。
+
+用法：python scripts/bench_chat_history.py [--count 10000] [--width 600] [--height 800]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from PySide6.QtCore import QThreadPool
+from PySide6.QtWidgets import QApplication
+
+from src.gui.chat_view import ChatBubbleDelegate, ChatListModel, ChatListView, make_image_item, make_item
+
+SAMPLE_TEXT = "今天天气很好，我们一起去唱歌吧。The quick brown fox jumps over the lazy dog. "
+IMAGE_PATHS = ["res/live2d/backgrounds/bg1.jpg", "res/live2d/backgrounds/bg2.jpg"]
+
+
+def rss_mb() -> float:
+    """
+    当前进程的常驻内存（MB）；取不到时返回 0
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+    except ImportError:
+        return 0.0
+
+
+def make_history(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        is_user = i % 2 == 0
+        if i % 97 == 0:
+            items.append(make_image_item(IMAGE_PATHS[i % len(IMAGE_PATHS)], is_user))
+            continue
+        repeat = rng.choice((1, 1, 1, 2, 3, 8))
+        text = f"#{i} " + SAMPLE_TEXT[: rng.randint(4, len(SAMPLE_TEXT))] * repeat
+        if rng.random() < 0.1:
+            text += "\n第二行\n第三行"
+        items.append(make_item("user" if is_user else "agent", text))
+    return items
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=600)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--frames", type=int, default=200, help="滚动重绘的帧数")
+    parser.add_argument("--page", type=int, default=20, help="向上翻页时插入的条数")
+    parser.add_argument("--drag-steps", type=int, default=40, help="模拟拖动改变宽度的步数（每步 3 px）")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    baseline_rss = rss_mb()
+
+    model = ChatListModel()
+    view = ChatListView()
+    view.setModel(model)
+    delegate = ChatBubbleDelegate(view)
+    view.setItemDelegate(delegate)
+    view.resize(args.width, args.height)
+    view.show()
+    app.processEvents()
+
+    history = make_history(args.count)
+    results = {}
+    results["insert"] = timed(lambda: model.insert_items(0, history))
+    results["first_layout"] = timed(view.doItemsLayout)
+    results["scroll_to_bottom"] = timed(lambda: (view.scrollToBottom(), view.viewport().repaint()))
+
+    scrollbar = view.verticalScrollBar()
+    step = max(1, scrollbar.maximum() // args.frames)
+    frame_ms = []
+    for value in range(scrollbar.maximum(), -1, -step):
+        frame_ms.append(timed(lambda: (scrollbar.setValue(value), view.viewport().repaint())))
+    frame_ms.sort()
+    # 滚轮式的小步滚动：相邻两帧大部分行相同
+    wheel_ms = []
+    for _ in range(args.frames):
+        wheel_ms.append(timed(lambda: (scrollbar.setValue(scrollbar.value() + 40), view.viewport().repaint())))
+    wheel_ms.sort()
+
+    # 滚动过程中请求的缩略图在线程池中解码，这里等待全部完成并投递到 GUI 线程
+    results["thumbnails_ready"] = timed(lambda: (QThreadPool.globalInstance().waitForDone(), app.processEvents()))
+
+    results["resize_relayout"] = timed(lambda: (view.resize(args.width + 120, args.height), view.doItemsLayout(), view.viewport().repaint()))
+    results["resize_back"] = timed(lambda: (view.resize(args.width, args.height), view.doItemsLayout(), view.viewport().repaint()))
+
+    # 模拟拖动窗口边缘：逐像素改变宽度，每一步都重新布局并重绘
+    drag_ms = []
+    for dx in range(0, args.drag_steps * 3, 3):
+        drag_ms.append(timed(lambda: (view.resize(args.width + dx, args.height), view.doItemsLayout(), view.viewport().repaint())))
+    drag_ms.sort()
+
+    # 向上翻页：在顶部插入一页并保持可见内容不动，记录锚点行的像素漂移
+    scrollbar.setValue(scrollbar.maximum() // 2)
+    anchor = view.indexAt(view.viewport().rect().center())
+    anchor_top = view.visualRect(anchor).top()
+    page = make_history(args.page, seed=1)
+    results["prepend_page"] = timed(lambda: (view.prepend_items(page), view.viewport().repaint()))
+    anchor_drift = view.visualRect(model.index(anchor.row() + len(page))).top() - anchor_top
+
+    print(f"Chat history benchmark: {args.count} messages, {args.width}x{args.height}, platform={QApplication.platformName()}")
+    for name, ms in results.items():
+        print(f"  {name:<18} {ms:9.1f} ms")
+    print(f"  scroll frames      {len(frame_ms)} frames, mean {statistics.fmean(frame_ms):.2f} ms, "
+          f"p95 {frame_ms[int(len(frame_ms) * 0.95) - 1]:.2f} ms, max {frame_ms[-1]:.2f} ms")
+    print(f"  wheel frames       {len(wheel_ms)} frames, mean {statistics.fmean(wheel_ms):.2f} ms, "
+          f"p95 {wheel_ms[int(len(wheel_ms) * 0.95) - 1]:.2f} ms, max {wheel_ms[-1]:.2f} ms")
+    print(f"  resize drag        {len(drag_ms)} steps, mean {statistics.fmean(drag_ms):.2f} ms, "
+          f"p95 {drag_ms[int(len(drag_ms) * 0.95) - 1]:.2f} ms, max {drag_ms[-1]:.2f} ms")
+    print(f"  prepend anchor     drift {anchor_drift} px")
+    print(f"  realized           {delegate.realized_stats()} of {model.message_count()} messages")
+    print(f"  layout cache       {delegate.layout_cache.stats()}")
+    print(f"  content height     {scrollbar.maximum() + view.viewport().height()} px")
+    print(f"  rss growth         {rss_mb() - baseline_rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,26 @@
-from .main_ui import MainWindow
-from ..live2d import live2d
 import sys
 import os
 import ctypes
 from PySide6.QtGui import QSurfaceFormat, QIcon
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-def ui_init() -> QApplication:
+
+
+def __getattr__(name):
+    # 主窗口依赖 OpenGL、NumPy 和 live2d 原生模块，等真正用到时再导入，
+    # 登录对话框和音频子进程不必为此付出导入时间
+    if name == "MainWindow":
+        from .main_ui import MainWindow
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def ui_init(render_config: dict | None = None) -> QApplication:
     # Set AppUserModelID for Windows taskbar icon
     if os.name == 'nt':
         myappid = 'LuoTianyi.Agent.Client.1.0'
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
+    from ..live2d import live2d
     live2d.init()
     app = QApplication(sys.argv)
     
@@ -26,6 +36,10 @@ def ui_init() -> QApplication:
     # Set default surface format for transparency
     fmt = QSurfaceFormat()
     fmt.setAlphaBufferSize(8)
+    # vsync 节奏下由交换间隔决定帧率，见 FrameScheduler
+    render_config = render_config or {}
+    if render_config.get("pacing", "timer") == "vsync":
+        fmt.setSwapInterval(render_config.get("swap_interval", 1))
     QSurfaceFormat.setDefaultFormat(fmt)
 
     return app
\ No newline at end of file
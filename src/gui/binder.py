@@ -1,55 +1,44 @@
 import time
 import threading
 import queue
-import multiprocessing
 import io
-import soundfile as sf
+import itertools
+from collections import deque
 from PySide6.QtCore import QObject, Signal
 from ..live2d import Live2dModel, live2d
-from ..utils.audio_processor import extract_audio_amplitude, decode_from_base64, play_audio, save_to_wav, AudioPlayerStream, calculate_amplitude_from_chunk
+from ..utils.audio_processor import extract_audio_amplitude, decode_from_base64, play_audio, save_to_wav, calculate_amplitude_from_chunk
+from ..utils.audio_cache import AudioCache
+from ..utils.audio_worker import AudioWorker
+from ..utils.history_cache import HistoryCache
 from ..utils.logger import get_logger
+from ..utils.pipeline import PipelineWorker
 import numpy as np
-from typing import Dict, Callable
+from typing import Any, Dict, Callable, List, Tuple
 
-def run_audio_player_worker(queue_in: multiprocessing.Queue, queue_out: multiprocessing.Queue):
-    """
-    Worker process for audio playback to avoid GIL contention.
+class AgentBinder(QObject):
     """
-    player = AudioPlayerStream()
-    
-    while True:
-        try:
-            task = queue_in.get()
-            if task is None:
-                break
-            
-            cmd = task.get("cmd")
-            if cmd == "append":
-                data = task.get("data")
-                if data:
-                    player.append_buffer(data)
-            
-            elif cmd == "wait_finish":
-                player.wait_until_empty()
-                player.header_parsed = False # Reset for new stream
-                if queue_out:
-                    queue_out.put("finished")
-                    
-        except Exception as e:
-            # print(f"Audio worker error: {e}") 
-            pass
-    
-    player.close()
+    连接界面、网络和播放进程的调度层。
 
-class AgentBinder(QObject):
+    由一组常驻工作线程组成，线程之间用有界队列连接：
+    - network: 按顺序执行对话请求，读取服务器的流式回复
+    - history: 拉取历史记录
+    - scheduler: 唯一持有句子/轮次状态的线程，处理回复分片和播放进程回传的事件
+    - mouth: 口型驱动
+    - cache_writer: 把播放过的句子编码为 FLAC 写入音频缓存，不占用 scheduler
+    另有一个转发线程把播放进程的事件送入 scheduler 队列。
 
-    response_signal = Signal(str)
-    update_signal = Signal(str)
-    delete_signal = Signal()
+    用户的消息进入轮次队列，按顺序回复；回复播放期间仍可继续发送，
+    队列中的轮次数达到 max_pending_turns 时才通过 free_signal 暂停输入。
+    开启 presubmit 时，下一轮请求会在上一轮还在播放时就发给服务器，
+    让生成与播放重叠。
+    """
+
+    reply_delta_signal = Signal(int, str)  # turn_id, 新呈现的一段回复文本；同一轮的各段依次拼接成一条回复
+    thinking_signal = Signal(bool)  # 是否显示"正在输入"气泡
     free_signal = Signal(bool)
-    history_signal = Signal(list, int)  # history_list, current_top_index
+    history_signal = Signal(list, int, bool)  # history_list, current_top_index, from_cache
 
-    def __init__(self, hear_callback: Callable[[str], Dict], hear_picture_callback: Callable[[str], Dict] = None, history_callback: Callable[[int, int], tuple] = None):
+    def __init__(self, hear_callback: Callable[[str], Dict], hear_picture_callback: Callable[[str], Dict] = None, history_callback: Callable[[int, int], tuple] = None, audio_cache_config: Dict[str, Any] | None = None, turn_queue_config: Dict[str, Any] | None = None, audio_worker: AudioWorker | None = None, history_cache: HistoryCache | None = None):
         super().__init__()
         self.logger = get_logger(self.__class__.__name__)
         if hear_callback:
@@ -59,230 +48,577 @@ class AgentBinder(QObject):
         
         self.hear_picture_callback = hear_picture_callback
         self.history_callback = history_callback
+        self.history_cache = history_cache
     
-        self.thinking_thread: threading.Thread | None = None
+        self._thinking_lock = threading.Lock()
         self.thinking: bool = False
         self.model: Live2dModel | None = None
 
-        # Audio Process
-        self.audio_queue_in = multiprocessing.Queue()
-        self.audio_queue_out = multiprocessing.Queue()
-        self.audio_process = multiprocessing.Process(
-            target=run_audio_player_worker, 
-            args=(self.audio_queue_in, self.audio_queue_out),
-            daemon=True
+        audio_cache_config = audio_cache_config or {}
+        self.audio_cache = AudioCache(
+            cache_dir=audio_cache_config.get("cache_dir", "temp/audio_cache"),
+            max_size_mb=audio_cache_config.get("max_size_mb", 200),
         )
-        self.audio_process.start()
 
-    def _mouth_move_stream(self, init_value, mouth_queue: queue.Queue, stop_event: threading.Event, fps=60):
-        while not stop_event.is_set():
-            try:
-                amps = mouth_queue.get(timeout=0.05)
-                if amps is None:
-                    break
-                
-                # We have a chunk of amplitudes (frames)
-                start_time = time.time()
-                while True:
-                    elapesed = time.time() - start_time
-                    if elapesed >= len(amps) / fps:
-                        break
-                    goal_idx = int(elapesed * fps)
-                    target_val = amps[goal_idx]
-                    self.model.SetParameterValue("ParamMouthOpenY", target_val, weight=0.3)
-                    time.sleep(1 / fps)
+        turn_queue_config = turn_queue_config or {}
+        self.max_pending_turns: int = max(1, turn_queue_config.get("max_pending_turns", 3))
+        self.presubmit: bool = turn_queue_config.get("presubmit", True)
+        self._turn_lock = threading.Lock()
+        self._queued_turns: int = 0  # 已提交、尚未播放结束的对话轮次（含重播）
+        self._replaying: bool = False  # 重播期间不接受新的轮次
+        self._playback_idle = threading.Event()
+        self._playback_idle.set()
 
-            except queue.Empty:
-                continue
-                
-        if self.model:
-            self.model.SetParameterValue("ParamMouthOpenY", init_value, weight=1)
+        # Audio Process
+        # 播放进程由 audio-events 线程监督，重启后队列会更换，统一通过 _send_audio 发送命令
+        self.audio_worker = audio_worker or AudioWorker().start()
 
-    def _process_stream_response(self, response_generator):
-        """Unified streaming processor for hear and hear_picture"""
-        # player running in separate process
-        mouth_queue = queue.Queue()
-        stop_mouth_event = threading.Event()
-        
-        init_value = self.model.GetParameterValue("ParamMouthOpenY") if self.model else 0
-        mouth_thread = threading.Thread(
-            target=self._mouth_move_stream, 
-            args=(init_value, mouth_queue, stop_mouth_event)
-        )
-        mouth_thread.daemon = True
-        mouth_thread.start()
+        # 以下状态只在 scheduler 线程中读写
+        # 已发给播放进程、尚未播放完的命令，播放进程重启后据此重发
+        self._audio_journal: deque[Dict[str, Any]] = deque()
+        self._journal_sentence: int | None = None  # 最近一次 begin 的句子
+        self._lost_sentence: int | None = None  # 重启时正在播放、已放弃的句子
+        self._cues: deque[Dict[str, Any]] = deque()  # 按播放顺序排列的文本/表情/口型
+        self._next_sentence_id: int = 0
+        self._playing_sentence: int | None = None
+        self._receiving: Dict[str, Any] | None = None  # 正在接收回复的轮次
+        self._draining: Dict[int, Dict[str, Any]] = {}  # 等待播放结束的轮次
+        self._turn_ids = itertools.count()
+        self._active_turns: int = 0
+
+        self.network = PipelineWorker("network", self._run_turn, maxsize=8)
+        self.history = PipelineWorker("history", self._fetch_history, maxsize=8)
+        self.scheduler = PipelineWorker("scheduler", self._schedule, maxsize=256)
+        self.mouth = PipelineWorker("mouth", self._drive_mouth, maxsize=1024)
+        self.cache_writer = PipelineWorker("cache_writer", self._write_audio_cache, maxsize=32)
+        self._workers = [self.network, self.history, self.scheduler, self.mouth, self.cache_writer]
+        for worker in self._workers:
+            worker.start()
+        self._audio_event_thread = threading.Thread(target=self._audio_event_pump, name="audio-events", daemon=True)
+        self._audio_event_thread.start()
 
-        is_first_audio = True
-        local_samplerate = 0
-        local_channels = 0
-        local_subtype = None
+    def shutdown(self, timeout: float = 2.0):
+        """
+        程序退出时调用：结束播放进程，并等待 audio-events 线程退出
+        """
+        self.audio_worker.stop(timeout)
+        self._audio_event_thread.join(timeout=timeout)
 
+    def metrics(self) -> Dict[str, Any]:
+        """
+        调度层运行指标：线程数、各工作线程的队列深度与处理计数
+        """
         try:
-            for response in response_generator:
-                reply_text = response.get("text", "")
-                expression = response.get("expression", None)
-                audio_data = decode_from_base64(response.get("audio", b""))
-                is_final_package = response.get("is_final_package", False)
-                print(is_final_package)
-                
-                if reply_text:
-                     self.stop_thinking()
-                     self.response_signal.emit(reply_text)
-                
-                if expression and self.model:
-                    self.model.set_expression_by_cmd(expression)
-
-                if audio_data:
-                    # Feed Mouth
-                    amps = []
-                    if is_first_audio:
-                         try:
-                             with sf.SoundFile(io.BytesIO(audio_data)) as f:
-                                 local_samplerate = f.samplerate
-                                 local_channels = f.channels
-                                 local_subtype = f.subtype
-                         except Exception as e:
-                             self.logger.error(f"Header parse error: {e}")
-                             
-                         amps = extract_audio_amplitude(audio_data, fps=60)
-                         is_first_audio = False
-                    else:
-                        if local_samplerate > 0:
-                            amps = calculate_amplitude_from_chunk(
-                                audio_data, 
-                                local_samplerate, 
-                                local_channels, 
-                                local_subtype,
-                                fps=60
-                            )
-
-                    # Feed Audio
-                    if len(amps) > 0:
-                        mouth_queue.put(amps)
-                    
-                    self.audio_queue_in.put({"cmd": "append", "data": audio_data})
-                    
-                    if is_final_package:
-                        self.audio_queue_in.put({"cmd": "wait_finish"})
-                        # Wait for playing to finish
-                        _ = self.audio_queue_out.get()
-                        
-                        is_first_audio = True
-                        local_samplerate = 0
-                        self.start_thinking()
-                else:
-                    # Allow UI updates for text-only frames
-                    time.sleep(0.01)
-                    self.start_thinking()
-                print("Processed a response chunk.")
+            audio_queue_depth = self.audio_worker.queue_in.qsize()
+        except NotImplementedError:  # macOS 不支持 qsize
+            audio_queue_depth = -1
+        return {
+            "threads": threading.active_count(),
+            "workers": {worker.name: worker.metrics() for worker in self._workers},
+            "audio_queue_depth": audio_queue_depth,
+            "audio_worker": self.audio_worker.metrics(),
+            "pending_cues": len(self._cues),
+            "active_turns": self._active_turns,
+            "queued_turns": self._queued_turns,
+        }
+
+    # ---- network / history workers ----
 
+    def _run_turn(self, request: Dict[str, Any]):
+        """
+        network 线程：发送一轮对话请求，把流式回复逐个交给 scheduler
+        """
+        turn_id = request["turn_id"]
+        if not self.presubmit:
+            # 上一轮播放完再发送请求
+            self._playback_idle.wait()
+        self._playback_idle.clear()
+        self.scheduler.submit(("turn_start", turn_id))
+        try:
+            if request["kind"] == "picture":
+                response_generator = self.hear_picture_callback(request["payload"])
+            else:
+                # recv_callback return a generator for SSE
+                response_generator = self.recv_callback(request["payload"])
+            for response in response_generator:
+                package = {
+                    "text": response.get("text", ""),
+                    "expression": response.get("expression", None),
+                    "audio": decode_from_base64(response.get("audio", b"")),
+                    "is_final_package": response.get("is_final_package", False),
+                }
+                self.scheduler.submit(("package", turn_id, package))
         except Exception as e:
             self.logger.error(f"Stream Error: {e}")
         finally:
-            stop_mouth_event.set()
-            mouth_thread.join(timeout=1.0)
-            self.stop_thinking()
-            self.finish_reply()
+            self.scheduler.submit(("turn_end", turn_id))
+
+    def _fetch_history(self, request: tuple):
+        count, end_index = request
+        if not self.history_callback:
+            return
+        latest_page = end_index == -1 and self.history_cache is not None
+        cached = self.history_cache.take_cached() if latest_page else None
+        if cached:
+            # 先显示本地缓存的最新一页
+            self.history_signal.emit(cached[0], cached[1], True)
+        history_data, start_index = self.history_callback(count, end_index)
+        if latest_page and history_data:
+            self.history_cache.save(history_data, start_index)
+        if cached and (history_data, start_index) == cached:
+            # 与缓存一致，不必替换
+            self.history_signal.emit([], start_index, False)
+            return
+        self.history_signal.emit(history_data, start_index, False)
 
-    def hear(self, text: str):
+    def _audio_event_pump(self):
         """
-        接收用户输入的文本，并在后台处理
+        把播放进程回传的事件转发给 scheduler，同时监督播放进程：
+        每次最多等待一个心跳间隔，进程退出、失联或卡住时重启；
+        播放进程被 stop() 结束后退出
         """
-        def _hear(text:str):
-            self.start_thinking()
+        worker = self.audio_worker
+        while not worker.is_stopping():
             try:
-                # recv_callback return a generator for SSE
-                response_generator = self.recv_callback(text)
-                self._process_stream_response(response_generator)
-            except Exception as e:
-                self.logger.error(f"Error in hear loop: {e}")
-                self.stop_thinking()
-                self.finish_reply()
+                event = worker.queue_out.get(timeout=worker.heartbeat_interval)
+            except queue.Empty:
+                event = {}
+            except (EOFError, OSError, ValueError):
+                # 子进程异常退出时队列可能已损坏，交给下面的健康检查处理
+                event = {}
+            if event is None:
+                break
+            self._dispatch_audio_event(event)
+            reason = worker.check_health()
+            if reason:
+                self._restart_audio_worker(reason)
+
+    def _dispatch_audio_event(self, event: Dict[str, Any]):
+        kind = event.get("event")
+        if kind == "heartbeat":
+            self.audio_worker.on_heartbeat(event)
+        elif kind == "ready":
+            self.audio_worker.mark_ready(event)
+        elif kind:
+            self.scheduler.submit(("audio", event))
+
+    def _restart_audio_worker(self, reason: str):
+        worker = self.audio_worker
+        # 先转发旧进程死前已经发出的事件
+        while True:
+            try:
+                self._dispatch_audio_event(worker.queue_out.get_nowait())
+            except Exception:
+                break
+        cooldown = worker.last_restart_time + worker.restart_cooldown - time.monotonic()
+        if cooldown > 0:
+            # 设备持续出错时避免频繁重启
+            time.sleep(cooldown)
+        done = threading.Event()
+        self.scheduler.submit(("audio_restart", reason, done))
+        if not done.wait(timeout=30.0):
+            self.logger.error("Audio worker restart did not complete in time")
+
+    # ---- scheduler ----
 
-        # 使用线程避免阻塞 UI
-        thread = threading.Thread(target=_hear, args=(text,))
-        thread.daemon = True
-        thread.start()
+    def _schedule(self, item: tuple):
+        kind = item[0]
+        if kind == "package":
+            self._on_package(item[1], item[2])
+        elif kind == "audio":
+            self._trim_journal(item[1])
+            self._on_audio_event(item[1])
+        elif kind == "turn_start":
+            self._on_turn_start(item[1])
+        elif kind == "turn_end":
+            self._on_turn_end(item[1])
+        elif kind == "replay":
+            self._on_replay(item[1])
+        elif kind == "audio_restart":
+            self._on_audio_restart(item[1], item[2])
 
-    def hear_picture(self, image_path: str):
-        def _hear(image_path:str):
+    def _new_turn(self, turn_id: int, kind: str = "chat") -> Dict[str, Any]:
+        self._playback_idle.clear()
+        self._active_turns += 1
+        return {
+            "turn_id": turn_id,
+            "kind": kind,
+            "sentence_id": None,
+            "sentence_text": "",
+            "sentence_chunks": [],
+            "last_text": "",
+            "last_expression": None,
+            "envelope": None,
+            "samplerate": 0,
+            "channels": 0,
+            "subtype": None,
+        }
+
+    def _on_turn_start(self, turn_id: int):
+        self._receiving = self._new_turn(turn_id)
+        if not self._cues and self._playing_sentence is None:
             self.start_thinking()
+
+    def _on_package(self, turn_id: int, package: Dict[str, Any]):
+        turn = self._receiving
+        if not turn or turn["turn_id"] != turn_id:
+            return
+        reply_text = package["text"]
+        expression = package["expression"]
+        audio_data = package["audio"]
+        if reply_text:
+            turn["last_text"] = reply_text
+        if expression:
+            turn["last_expression"] = expression
+
+        amps = []
+        if audio_data and turn["sentence_id"] is None:
+            # 新句子：文本和表情挂到句子上，等音频真正开始播放时再呈现
+            turn["sentence_id"] = self._begin_sentence(turn_id, reply_text, expression)
+            turn["sentence_text"] = reply_text or turn["last_text"]
+            turn["sentence_chunks"] = []
+            reply_text, expression = "", None
+            # 唱过的歌直接使用缓存的口型包络，不再逐片分析
+            envelope = None
+            if self._is_singing(turn["last_expression"]):
+                envelope = self.audio_cache.load_envelope(turn["sentence_text"])
+            turn["envelope"] = envelope
+            if envelope is not None:
+                self._feed_mouth(turn["sentence_id"], envelope)
             try:
-                # recv_callback return a generator for SSE
-                response_generator = self.hear_picture_callback(image_path)
-                self._process_stream_response(response_generator)
+                import soundfile as sf  # 收到第一段音频时才加载
+                with sf.SoundFile(io.BytesIO(audio_data)) as f:
+                    turn["samplerate"] = f.samplerate
+                    turn["channels"] = f.channels
+                    turn["subtype"] = f.subtype
             except Exception as e:
-                self.logger.error(f"Error in hear loop: {e}")
-                self.stop_thinking()
-                self.finish_reply()
+                self.logger.error(f"Header parse error: {e}")
+            if envelope is None:
+                amps = extract_audio_amplitude(audio_data, fps=60)
+        elif audio_data and turn["envelope"] is None and turn["samplerate"] > 0:
+            amps = calculate_amplitude_from_chunk(
+                audio_data, 
+                turn["samplerate"], 
+                turn["channels"], 
+                turn["subtype"],
+                fps=60
+            )
 
-        # 使用线程避免阻塞 UI
-        thread = threading.Thread(target=_hear, args=(image_path,))
-        thread.daemon = True
-        thread.start()
+        if reply_text or expression:
+            self._add_cue({"turn_id": turn_id, "sentence_id": None, "text": reply_text, "expression": expression})
 
+        if audio_data:
+            # Feed Mouth
+            if len(amps) > 0:
+                self._feed_mouth(turn["sentence_id"], amps)
 
-    def load_history(self, count: int, end_index: int = -1):
+            # Feed Audio
+            self._send_audio({"cmd": "append", "data": audio_data})
+            turn["sentence_chunks"].append(audio_data)
+            
+            if package["is_final_package"]:
+                # 不等待本句播放结束，继续接收下一句，由播放进程首尾相接地播放
+                self._send_audio({"cmd": "end"})
+                # FLAC 编码和口型包络计算交给 cache_writer，scheduler 继续处理下一句的分片；
+                # 写入积压时直接放弃这句的缓存，不阻塞播放
+                if not self.cache_writer.submit((turn["sentence_text"], turn["sentence_chunks"]), block=False):
+                    self.logger.warning("Audio cache writer is busy, skipping cache for this sentence")
+                turn["sentence_id"] = None
+                turn["sentence_chunks"] = []
+                turn["envelope"] = None
+                turn["samplerate"] = 0
+
+    def _on_turn_end(self, turn_id: int):
+        turn = self._receiving
+        if not turn or turn["turn_id"] != turn_id:
+            return
+        self._receiving = None
+        if turn["sentence_id"] is not None:
+            self._send_audio({"cmd": "end"})
+        self._drain(turn)
+
+    def _on_replay(self, sentences: List[Tuple[str, str]]):
+        turn = self._new_turn(self._allocate_turn_id(), kind="replay")
+        try:
+            for text, path in sentences:
+                sentence_id = self._begin_sentence(turn["turn_id"], "", None)
+                envelope = self.audio_cache.load_envelope(text)
+                if envelope is not None and len(envelope) > 0:
+                    self._feed_mouth(sentence_id, envelope)
+                self._send_audio({"cmd": "append_file", "path": path})
+                self._send_audio({"cmd": "end"})
+        except Exception as e:
+            self.logger.error(f"Replay Error: {e}")
+        self._drain(turn)
+
+    def _drain(self, turn: Dict[str, Any]):
+        # 播放进程播放完之前排队的所有句子后会回传 drained 事件
+        self._draining[turn["turn_id"]] = turn
+        self._send_audio({"cmd": "wait_finish", "token": turn["turn_id"]})
+
+    def _complete_turn(self, turn: Dict[str, Any]):
+        self._active_turns -= 1
+        if self._active_turns == 0:
+            remaining = list(self._cues)
+            self._cues.clear()
+            for cue in remaining:
+                self._present_cue(cue)
+            self.mouth.submit(("reset",))
+            self._playback_idle.set()
+        if not self._receiving:
+            self.stop_thinking()
+        self.finish_reply()
+
+    def _send_audio(self, command: Dict[str, Any]):
         """
-        请求加载历史记录
-        :param count: 加载的数量
-        :param end_index: 结束索引（不包含），-1表示从最新开始
+        向播放进程发送一条命令并记入日志；重启时放弃的句子余下的分片直接丢弃
         """
-        if self.history_callback:
-            thread = threading.Thread(target=self._fetch_history, args=(count, end_index))
-            thread.daemon = True
-            thread.start()
+        cmd = command["cmd"]
+        if cmd == "begin":
+            self._journal_sentence = command["sentence_id"]
+        elif self._lost_sentence is not None and self._journal_sentence == self._lost_sentence and cmd != "wait_finish":
+            if cmd == "end":
+                self._lost_sentence = None
+            else:
+                self.audio_worker.dropped_chunks += 1
+            return
+        self._audio_journal.append(command)
+        self.audio_worker.note_command(command)
+        self.audio_worker.queue_in.put(command)
 
-    def _fetch_history(self, count, end_index):
-        if self.history_callback:
-            history_data, start_index = self.history_callback(count, end_index)
-            self.history_signal.emit(history_data, start_index)
+    def _trim_journal(self, event: Dict[str, Any]):
+        """
+        播放进程按顺序处理命令，事件到达时日志开头对应的命令已经执行完毕
+        """
+        journal = self._audio_journal
+        kind = event.get("event")
+        if kind == "started":
+            while journal and not (journal[0]["cmd"] == "begin" and journal[0]["sentence_id"] == event.get("sentence_id")):
+                journal.popleft()
+        elif kind == "finished":
+            while journal and journal.popleft()["cmd"] != "end":
+                pass
+        elif kind == "drained":
+            while journal and journal[0]["cmd"] == "wait_finish":
+                if journal.popleft()["token"] == event.get("token"):
+                    break
 
-    def update_bubble(self) -> None:
-        '''
-        等待LLM响应，在这个过程中在气泡中显示'...'直到响应完成
-        '''
-        self.response_signal.emit(" ")
-        while self.thinking:
-            for i in range(3):
-                if not self.thinking:
+    def _on_audio_restart(self, reason: str, done: threading.Event):
+        """
+        换用新的播放进程并重发未播放的命令。重启时正在播放的句子被放弃，
+        按播放结束处理，之后的句子和 drain 标记照常进行，轮次不会卡住。
+        """
+        try:
+            if not self.audio_worker.restart(reason):
+                return
+            pending = list(self._audio_journal)
+            self._audio_journal.clear()
+            lost = self._playing_sentence
+            if lost is not None and pending and pending[0]["cmd"] == "begin" and pending[0]["sentence_id"] == lost:
+                pending.pop(0)
+                while pending and pending[0]["cmd"] != "end":
+                    pending.pop(0)
+                    self.audio_worker.dropped_chunks += 1
+                if pending:
+                    pending.pop(0)
+                elif self._journal_sentence == lost:
+                    # 这一句还在接收中，后续分片到达时丢弃
+                    self._lost_sentence = lost
+            for command in pending:
+                self._send_audio(command)
+            if lost is not None:
+                self.mouth.submit(("reset",))
+                self._on_audio_event({"event": "finished", "sentence_id": lost})
+        except Exception as e:
+            self.logger.error(f"Audio worker restart failed: {e}")
+        finally:
+            done.set()
+
+    def _begin_sentence(self, turn_id: int, text: str, expression: str | None) -> int:
+        sentence_id = self._next_sentence_id
+        self._next_sentence_id += 1
+        self._cues.append({"turn_id": turn_id, "sentence_id": sentence_id, "text": text, "expression": expression, "amps": []})
+        self._send_audio({"cmd": "begin", "sentence_id": sentence_id})
+        return sentence_id
+
+    def _add_cue(self, cue: Dict[str, Any]):
+        """
+        不带音频的文本/表情：前面没有待播放的句子时立即呈现，否则排在它们之后
+        """
+        if self._cues or self._playing_sentence is not None:
+            self._cues.append(cue)
+            return
+        self._present_cue(cue)
+
+    def _feed_mouth(self, sentence_id: int, amps):
+        if sentence_id == self._playing_sentence:
+            self.mouth.submit(("amps", amps))
+            return
+        for cue in self._cues:
+            if cue["sentence_id"] == sentence_id:
+                cue["amps"].append(amps)
+                return
+
+    def _present_cue(self, cue: Dict[str, Any]):
+        if cue.get("text"):
+            self.stop_thinking()
+            self.reply_delta_signal.emit(cue["turn_id"], cue["text"])
+        if cue.get("expression") and self.model:
+            self.model.post_expression(cue["expression"])
+
+    def _on_audio_event(self, event: Dict[str, Any]):
+        """
+        处理播放进程回传的事件，在句子开始播放时呈现对应的文本、表情和口型
+        """
+        kind = event.get("event")
+        if kind == "started":
+            sentence_id = event.get("sentence_id")
+            while self._cues:
+                cue = self._cues.popleft()
+                if cue["sentence_id"] == sentence_id:
+                    self._playing_sentence = sentence_id
+                    for amps in cue["amps"]:
+                        self.mouth.submit(("amps", amps))
+                self._present_cue(cue)
+                if cue["sentence_id"] == sentence_id:
                     break
-                self.update_signal.emit("." * (i + 1))
-                time.sleep(0.1)
+        elif kind == "finished":
+            self._playing_sentence = None
+            while self._cues and self._cues[0]["sentence_id"] is None:
+                self._present_cue(self._cues.popleft())
+            if self._receiving and not self._cues:
+                # 下一句还没有到达，显示思考气泡
+                self.start_thinking()
+        elif kind == "drained":
+            turn = self._draining.pop(event.get("token"), None)
+            if turn:
+                self._complete_turn(turn)
 
-        self.delete_signal.emit()
+    def _write_audio_cache(self, item: tuple):
+        text, chunks = item
+        self.audio_cache.put(text, chunks)
 
-    def start_thinking(self):
+    def _is_singing(self, expression: str | None) -> bool:
+        if not expression:
+            return False
+        if self.model:
+            expression = self.model.cmd_to_expression.get(expression, expression)
+        return expression == "sing"
+
+    # ---- mouth ----
+
+    def _drive_mouth(self, item: tuple, fps=60):
+        """
+        mouth 线程：把口型包络按顺序提交给模型，由渲染循环按时间采样，无需逐帧 sleep
+        """
+        if not self.model:
+            return
+        kind = item[0]
+        if kind == "reset":
+            self.model.post_mouth_reset()
+        elif kind == "amps":
+            self.model.post_mouth_track(item[1], fps=fps)
+
+    # ---- public API ----
+
+    def _allocate_turn_id(self) -> int:
+        return next(self._turn_ids)
+
+    def _enqueue_turn(self, kind: str, payload: str) -> bool:
+        with self._turn_lock:
+            if self._replaying or self._queued_turns >= self.max_pending_turns:
+                return False
+            if self._queued_turns == 0 and self._active_turns == 0:
+                self.start_thinking()
+            self._queued_turns += 1
+            free = self._queued_turns < self.max_pending_turns
+        self.free_signal.emit(free)
+        self.network.submit({"turn_id": self._allocate_turn_id(), "kind": kind, "payload": payload})
+        return True
+
+    def hear(self, text: str) -> bool:
         """
-        开始思考，显示动态气泡
+        接收用户输入的文本，放入轮次队列，由 network 线程按顺序处理
+        :return: 轮次队列已满时返回 False
         """
-        if self.thinking:
-            return  # 已经在思考中
-        if self.thinking_thread and self.thinking_thread.is_alive():
-            return  # 已经在思考中
+        return self._enqueue_turn("text", text)
+
+    def hear_picture(self, image_path: str) -> bool:
+        return self._enqueue_turn("picture", image_path)
+
+    def is_idle(self) -> bool:
+        """
+        没有排队或正在播放的轮次
+        """
+        return self._queued_turns == 0 and self._active_turns == 0
+
+    def has_cached_audio(self, texts: str | List[str]) -> bool:
+        if isinstance(texts, str):
+            texts = [texts]
+        return any(self.audio_cache.contains(text) for text in texts)
 
-        self.thinking = True
+    def replay(self, texts: str | List[str]) -> bool:
+        """
+        从本地缓存重播一条回复的语音
+        :param texts: 回复的各句文本（流式回复由多句拼接而成），没有缓存的句子跳过
+        :return: 至少一句缓存命中并开始播放时返回 True
+        """
+        if not self.is_idle():
+            return False
+        if isinstance(texts, str):
+            texts = [texts]
+        sentences = [(text, path) for text in texts if (path := self.audio_cache.lookup(text))]
+        if not sentences:
+            return False
+        with self._turn_lock:
+            if self._queued_turns or self._active_turns:
+                return False
+            # 重播与对话轮次一样计入轮次队列，播放结束 (drained) 后由 finish_reply 释放
+            self._queued_turns += 1
+            self._replaying = True
+        # 重播期间锁定输入，避免新轮次的音频与重播在播放进程中交错
         self.free_signal.emit(False)
-        self.thinking_thread = threading.Thread(target=self.update_bubble)
-        self.thinking_thread.daemon = True
-        self.thinking_thread.start()
+        self.scheduler.submit(("replay", sentences))
+        return True
+
+    def load_history(self, count: int, end_index: int = -1):
+        """
+        请求加载历史记录
+        :param count: 加载的数量
+        :param end_index: 结束索引（不包含），-1表示从最新开始
+        """
+        if self.history_callback:
+            self.history.submit((count, end_index))
+
+    def start_thinking(self):
+        """
+        开始思考，显示"正在输入"气泡；动画由界面线程的定时器驱动
+        """
+        with self._thinking_lock:
+            if self.thinking:
+                return  # 已经在思考中
+            self.thinking = True
+        self.thinking_signal.emit(True)
 
     def stop_thinking(self):
         """
-        停止思考，移除动态气泡
+        停止思考，移除"正在输入"气泡，不阻塞调用线程
         """
-        if not self.thinking:
-            return  # 不在思考中
-        self.thinking = False
-        if self.thinking_thread:
-            self.thinking_thread.join()
-            self.thinking_thread = None
+        with self._thinking_lock:
+            if not self.thinking:
+                return  # 不在思考中
+            self.thinking = False
+        self.thinking_signal.emit(False)
     
     def finish_reply(self):
         '''
-        本轮对话结束，允许用户输入
+        本轮对话或重播结束，轮次队列空出位置，允许用户继续输入
         '''
-        self.free_signal.emit(True)
+        with self._turn_lock:
+            self._queued_turns = max(0, self._queued_turns - 1)
+            self._replaying = False
+            free = self._queued_turns < self.max_pending_turns
+        self.free_signal.emit(free)
 
     # def start_mouth_move(self, wav: str | bytes, fps: int = 60):
     #     """
@@ -0,0 +1,563 @@
+"""
+聊天记录视图
+
+历史记录以 QListView + QAbstractListModel 的方式呈现：模型只保存 ConversationItem，
+气泡由 ChatBubbleDelegate 直接绘制，只有可见的行才会被绘制，不再为每条消息创建
+QTextEdit 等控件。文本气泡的尺寸按可用宽度缓存，滚动和重绘时不重新排版。
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPoint, QRect, QRectF, QSize, Qt, QTimer
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QImageReader, QPainter, QStaticText, QTextOption
+from PySide6.QtWidgets import QAbstractItemView, QFrame, QListView, QStyledItemDelegate, QStyleOptionViewItem
+
+from ..types import ConversationItem
+from .text_layout_cache import TextLayoutCache
+from .thumbnail_loader import ThumbnailLoader
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def make_item(source: str, content: str, item_type: str = "text") -> ConversationItem:
+    return ConversationItem(timestamp=datetime.now().strftime(TIME_FORMAT), source=source, type=item_type, content=content)
+
+
+def make_image_item(image_path: str, is_user: bool) -> ConversationItem:
+    return make_item("user" if is_user else "agent", json.dumps({"image_client_path": image_path}, ensure_ascii=False), "picture")
+
+
+class ChatListModel(QAbstractListModel):
+    """
+    聊天记录模型。正在输入时在末尾附加一个 "typing" 行，由代理绘制跳动的圆点。
+    """
+
+    ItemRole = Qt.ItemDataRole.UserRole + 1
+    KindRole = Qt.ItemDataRole.UserRole + 2  # "text" / "picture" / "typing"
+    IsUserRole = Qt.ItemDataRole.UserRole + 3
+    ImagePathRole = Qt.ItemDataRole.UserRole + 4
+
+    def __init__(self, parent=None, typing_interval_ms: int = 300):
+        super().__init__(parent)
+        self.items: List[ConversationItem] = []
+        self.typing: bool = False
+        self.typing_phase: int = 0
+        self._image_paths: Dict[int, Optional[str]] = {}  # id(item) -> 图片路径，避免重复解析 JSON
+        self._segments: Dict[int, List[str]] = {}  # id(item) -> 流式回复逐段追加的文本
+        self._typing_timer = QTimer(self)
+        self._typing_timer.setInterval(typing_interval_ms)
+        self._typing_timer.timeout.connect(self._advance_typing)
+
+    # ---- Qt 接口 ----
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.items) + (1 if self.typing else 0)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole) -> Any:
+        row = index.row()
+        if not index.isValid() or row < 0 or row >= self.rowCount():
+            return None
+        if row == len(self.items):
+            if role == self.KindRole:
+                return "typing"
+            if role == self.IsUserRole:
+                return False
+            return None
+        item = self.items[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.content if item.type != "picture" else None
+        if role == self.ItemRole:
+            return item
+        if role == self.KindRole:
+            return "picture" if item.type == "picture" else "text"
+        if role == self.IsUserRole:
+            return item.source == "user"
+        if role == self.ImagePathRole:
+            return self.image_path(item)
+        return None
+
+    def flags(self, index) -> Qt.ItemFlag:
+        return Qt.ItemFlag.ItemIsEnabled if index.isValid() else Qt.ItemFlag.NoItemFlags
+
+    # ---- 编辑 ----
+
+    def message_count(self) -> int:
+        return len(self.items)
+
+    def item(self, row: int) -> Optional[ConversationItem]:
+        return self.items[row] if 0 <= row < len(self.items) else None
+
+    def insert_items(self, row: int, items: List[ConversationItem]) -> None:
+        if not items:
+            return
+        row = max(0, min(row, len(self.items)))
+        self.beginInsertRows(QModelIndex(), row, row + len(items) - 1)
+        self.items[row:row] = items
+        self.endInsertRows()
+
+    def append_item(self, item: ConversationItem) -> int:
+        row = len(self.items)
+        self.insert_items(row, [item])
+        return row
+
+    def remove_items(self, row: int, count: int) -> None:
+        count = min(count, len(self.items) - row)
+        if row < 0 or count <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        for item in self.items[row:row + count]:
+            self._image_paths.pop(id(item), None)
+            self._segments.pop(id(item), None)
+        del self.items[row:row + count]
+        self.endRemoveRows()
+
+    def append_text(self, row: int, text: str) -> None:
+        """
+        在已有的文本消息末尾追加一段（流式回复），只通知这一行的数据变化
+        """
+        item = self.item(row)
+        if item is None or not text:
+            return
+        self._segments.setdefault(id(item), [item.content]).append(text)
+        item.content += text
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def segments(self, item: ConversationItem) -> List[str]:
+        """
+        消息由哪几段文本拼接而成；不是逐段追加的消息只有一段
+        """
+        return self._segments.get(id(item), [item.content])
+
+    def image_path(self, item: ConversationItem) -> Optional[str]:
+        key = id(item)
+        if key not in self._image_paths:
+            try:
+                self._image_paths[key] = json.loads(item.content).get("image_client_path")
+            except (ValueError, AttributeError):
+                self._image_paths[key] = None
+        return self._image_paths[key]
+
+    # ---- 正在输入 ----
+
+    def set_typing(self, typing: bool) -> None:
+        if typing == self.typing:
+            return
+        row = len(self.items)
+        if typing:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.typing = True
+            self.typing_phase = 0
+            self.endInsertRows()
+            self._typing_timer.start()
+        else:
+            self._typing_timer.stop()
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.typing = False
+            self.endRemoveRows()
+
+    def _advance_typing(self) -> None:
+        # 动画只触发这一行的重绘，不引起布局计算
+        self.typing_phase = (self.typing_phase + 1) % 3
+        index = self.index(len(self.items))
+        self.dataChanged.emit(index, index, [self.KindRole])
+
+
+class ChatBubbleDelegate(QStyledItemDelegate):
+    """
+    绘制文本、图片和"正在输入"气泡。
+
+    文本气泡的宽度取文字自然宽度与行宽 60% 中的较小者，按字符换行；
+    气泡尺寸由 TextLayoutCache 按宽度档位缓存，窗口缩放时大多数行直接命中缓存。
+    文本在首次绘制时排版为 QStaticText，之后的重绘只绘制字形；ChatListView 通过 realize
+    告知视口附近的行，范围外的排版和缩略图随即释放，长会话的内存只与视口大小有关。
+
+    只有实体化范围内的行在 sizeHint 中精确测量（文本排版、读取图片文件头）；范围外的行沿用
+    上次报告的高度，从未报告过的按字符数估算，每次布局的开销不随会话长度中的测量量增长。
+    行进入实体化范围时若精确高度与报告过的不同，realize 返回 True，由视图重新布局。
+    缩略图由 ThumbnailLoader 在后台线程解码，就绪前先绘制同尺寸的占位框，完成后重绘视口，行高不会变化。
+    """
+
+    MARGIN_X = 10
+    MARGIN_Y = 5
+    PADDING = 10
+    RADIUS = 10
+    MIN_BUBBLE_WIDTH = 50
+    MAX_WIDTH_RATIO = 0.6
+    MAX_IMAGE_SIZE = 250
+    TYPING_SIZE = QSize(72, 40)
+
+    USER_COLOR = QColor("#FFFFFF")
+    AGENT_COLOR = QColor("#88EDFF")
+    TEXT_COLOR = QColor("#000000")
+    TYPING_DOT_IDLE = QColor("#5FB8C8")
+    PLACEHOLDER_COLOR = QColor("#E4E4E4")
+
+    def __init__(self, parent=None, font_size: int = 16, thumbnail_cache_dir: Optional[str] = "temp/thumbnails",
+                 thumbnail_cache_max_mb: float = 100):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(font_size)
+        self.metrics = QFontMetrics(self.font)
+        # 与 TextLayoutCache 的测量方式一致：按字符换行
+        self.text_option = QTextOption(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.text_option.setWrapMode(QTextOption.WrapMode.WrapAnywhere)
+        self.layout_cache = TextLayoutCache(self.font, padding=self.PADDING, min_width=self.MIN_BUBBLE_WIDTH)
+        # 已实体化的文本排版：id(item) -> (文本, 宽度, QStaticText)，只保留视口附近的行
+        self._static_texts: Dict[int, Tuple[str, int, QStaticText]] = {}
+        # 实体化范围内的行（id(item)），sizeHint 只为这些行精确测量
+        self._realized: set = set()
+        # 各行上次由 sizeHint 报告的气泡高度：id(item) -> (内容长度, 高度)
+        self._bubble_heights: Dict[int, Tuple[int, int]] = {}
+        self._image_sizes: Dict[str, QSize] = {}
+        self.thumbnails = ThumbnailLoader(thumbnail_cache_dir, max_disk_mb=thumbnail_cache_max_mb, parent=self)
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+
+    # ---- 尺寸 ----
+
+    def max_bubble_width(self, row_width: int) -> int:
+        return max(int(row_width * self.MAX_WIDTH_RATIO), self.MIN_BUBBLE_WIDTH)
+
+    def text_bubble_size(self, text: str, max_width: int) -> QSize:
+        return self.layout_cache.bubble_size(text, max_width)
+
+    def image_size(self, path: Optional[str]) -> QSize:
+        if not path:
+            return QSize(0, 0)
+        size = self._image_sizes.get(path)
+        if size is None:
+            size = QImageReader(path).size()
+            if size.isValid() and not size.isEmpty():
+                size = size.scaled(min(size.width(), self.MAX_IMAGE_SIZE), min(size.height(), self.MAX_IMAGE_SIZE),
+                                   Qt.AspectRatioMode.KeepAspectRatio)
+            else:
+                size = QSize(0, 0)
+            self._image_sizes[path] = size
+        return size
+
+    def missing_image_size(self) -> QSize:
+        # 多留 2 px，避免小数宽度被取整后提示文字折行
+        return QSize(self.metrics.horizontalAdvance("Image not found") + 2, self.metrics.height())
+
+    def exact_bubble_size(self, model: ChatListModel, item: ConversationItem, row_width: int) -> QSize:
+        if item.type == "picture":
+            bubble = self.image_size(model.image_path(item))
+            return bubble if not bubble.isEmpty() else self.missing_image_size()
+        return self.text_bubble_size(item.content, self.max_bubble_width(row_width - 2 * self.MARGIN_X))
+
+    def estimate_bubble_height(self, model: ChatListModel, item: ConversationItem, row_width: int) -> int:
+        if item.type == "picture":
+            # 文件头还没读过时按最大尺寸占位
+            size = self._image_sizes.get(model.image_path(item))
+            if size is None:
+                return self.MAX_IMAGE_SIZE
+            return size.height() if not size.isEmpty() else self.missing_image_size().height()
+        return self.layout_cache.estimate_height(item.content, self.max_bubble_width(row_width - 2 * self.MARGIN_X))
+
+    def bubble_height(self, model: ChatListModel, item: ConversationItem, row_width: int) -> int:
+        """
+        实体化的行精确测量；其余行沿用上次报告的高度，内容变过或从未报告过时用估算值
+        """
+        key = id(item)
+        length = len(item.content)
+        if key in self._realized:
+            height = self.exact_bubble_size(model, item, row_width).height()
+        else:
+            reported = self._bubble_heights.get(key)
+            if reported is not None and reported[0] == length:
+                return reported[1]
+            height = self.estimate_bubble_height(model, item, row_width)
+        self._bubble_heights[key] = (length, height)
+        return height
+
+    def sizeHint(self, option: QStyleOptionViewItem, index) -> QSize:
+        row_width = option.rect.width() or (option.widget.viewport().width() if option.widget else 0)
+        model = index.model()
+        item = model.item(index.row()) if isinstance(model, ChatListModel) else None
+        if item is None:
+            height = self.TYPING_SIZE.height()
+        else:
+            height = self.bubble_height(model, item, row_width)
+        return QSize(row_width, height + 2 * self.MARGIN_Y)
+
+    def bubble_rect(self, row_rect: QRect, size: QSize, is_user: bool) -> QRect:
+        if is_user:
+            x = row_rect.right() - self.MARGIN_X - size.width() + 1
+        else:
+            x = row_rect.left() + self.MARGIN_X
+        return QRect(QPoint(x, row_rect.top() + self.MARGIN_Y), size)
+
+    # ---- 绘制 ----
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index) -> None:
+        kind = index.data(ChatListModel.KindRole)
+        is_user = bool(index.data(ChatListModel.IsUserRole))
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        if kind == "typing":
+            self.paint_typing(painter, option.rect, index.model().typing_phase)
+        elif kind == "picture":
+            dpr = option.widget.devicePixelRatioF() if option.widget else 1.0
+            self.paint_image(painter, option.rect, index.data(ChatListModel.ImagePathRole), is_user, dpr)
+        else:
+            text = index.data(Qt.ItemDataRole.DisplayRole) or ""
+            size = self.text_bubble_size(text, self.max_bubble_width(option.rect.width() - 2 * self.MARGIN_X))
+            bubble = self.bubble_rect(option.rect, size, is_user)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self.USER_COLOR if is_user else self.AGENT_COLOR)
+            painter.drawRoundedRect(bubble, self.RADIUS, self.RADIUS)
+            painter.setPen(self.TEXT_COLOR)
+            static_text = self.static_text(index.data(ChatListModel.ItemRole), text, size.width() - 2 * self.PADDING)
+            painter.drawStaticText(bubble.topLeft() + QPoint(self.PADDING, self.PADDING), static_text)
+        painter.restore()
+
+    def paint_image(self, painter: QPainter, row_rect: QRect, path: Optional[str], is_user: bool, dpr: float = 1.0) -> None:
+        size = self.image_size(path)
+        pixel_size = size * dpr
+        if size.isEmpty() or self.thumbnails.is_failed(path, pixel_size):
+            rect = self.bubble_rect(row_rect, self.missing_image_size(), is_user)
+            painter.setPen(self.TEXT_COLOR)
+            painter.drawText(QRectF(rect), "Image not found", QTextOption(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter))
+            return
+        rect = self.bubble_rect(row_rect, size, is_user)
+        pixmap = self.thumbnails.request(path, pixel_size)
+        if pixmap is None:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self.PLACEHOLDER_COLOR)
+            painter.drawRoundedRect(rect, self.RADIUS, self.RADIUS)
+            return
+        # 缩略图按设备像素生成，绘制时 1:1 铺到逻辑尺寸的矩形上
+        painter.drawPixmap(rect, pixmap)
+
+    def static_text(self, item: Optional[ConversationItem], text: str, width: int) -> QStaticText:
+        """
+        取得文本气泡已排好版的 QStaticText；重绘时只绘制字形，不再重新换行
+        """
+        key = id(item)
+        entry = self._static_texts.get(key)
+        if entry is not None and entry[1] == width and entry[0] == text:
+            return entry[2]
+        # QStaticText 的纯文本模式不识别 "\n"，换成 Unicode 行分隔符
+        static_text = QStaticText(text.replace("\n", "\u2028"))
+        static_text.setTextFormat(Qt.TextFormat.PlainText)
+        static_text.setTextOption(self.text_option)
+        static_text.setTextWidth(width)
+        static_text.prepare(font=self.font)
+        self._static_texts[key] = (text, width, static_text)
+        return static_text
+
+    def realize_items(self, items: List[ConversationItem]) -> None:
+        """
+        在下一次 realize 之前就按精确尺寸布局这些行，用于即将滚动到视口内的新消息
+        """
+        self._realized.update(id(item) for item in items)
+
+    def realize(self, model: ChatListModel, first: int, last: int, row_width: int, dpr: float = 1.0) -> bool:
+        """
+        只为 first..last 行保留绘制资源：精确测量这些行，预取其中图片的缩略图，释放范围外的缩略图和文本排版。
+        范围外的行只剩模型中的数据和上次报告的行高。
+        :return: 范围内有行的精确高度与上次报告的不同，需要重新布局
+        """
+        realized = set()
+        keep_texts = set()
+        keep_thumbnails = set()
+        changed = False
+        for row in range(max(first, 0), min(last, model.message_count() - 1) + 1):
+            item = model.items[row]
+            key = id(item)
+            realized.add(key)
+            height = self.exact_bubble_size(model, item, row_width).height()
+            if self._bubble_heights.get(key) != (len(item.content), height):
+                changed = True
+            if item.type == "picture":
+                path = model.image_path(item)
+                size = self.image_size(path)
+                if not size.isEmpty():
+                    pixel_size = size * dpr
+                    keep_thumbnails.add((path, pixel_size.width(), pixel_size.height()))
+                    self.thumbnails.request(path, pixel_size)
+            else:
+                keep_texts.add(key)
+        self._realized = realized
+        for key in [key for key in self._static_texts if key not in keep_texts]:
+            del self._static_texts[key]
+        self.thumbnails.retain(keep_thumbnails)
+        if len(self._bubble_heights) > 2 * model.message_count() + 100:
+            # 已删除的消息留下的条目
+            alive = {id(item) for item in model.items}
+            self._bubble_heights = {key: value for key, value in self._bubble_heights.items() if key in alive}
+        return changed
+
+    def realized_stats(self) -> Dict[str, int]:
+        return {"static_texts": len(self._static_texts), "thumbnails": self.thumbnails.pixmap_count()}
+
+    def on_thumbnail_ready(self, path: str) -> None:
+        view = self.parent()
+        if isinstance(view, QAbstractItemView):
+            view.viewport().update()
+
+    def paint_typing(self, painter: QPainter, row_rect: QRect, phase: int) -> None:
+        bubble = self.bubble_rect(row_rect, self.TYPING_SIZE, False)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.AGENT_COLOR)
+        painter.drawRoundedRect(bubble, self.RADIUS, self.RADIUS)
+
+        radius = 4
+        spacing = 14
+        x0 = bubble.center().x() - spacing
+        y = bubble.center().y()
+        for i in range(3):
+            painter.setBrush(self.TEXT_COLOR if i <= phase else self.TYPING_DOT_IDLE)
+            painter.drawEllipse(QPoint(x0 + i * spacing, y), radius, radius)
+
+
+class ChatListView(QListView):
+    """
+    只读、不可选中、按像素滚动的聊天列表；宽度变化时重新布局。
+    消息通过 append_items / prepend_items 批量插入，布局在插入后同步完成，
+    不需要 processEvents 或定时器等待布局。
+
+    滚动和布局后把视口附近的行范围告诉代理，只有这些行持有缩略图和文本排版，也只有这些行
+    按精确尺寸布局。行进入该范围后高度与估算值不同时重新布局一次，并保持视口顶部的行
+    （或停在底部时的底部）不动，估算误差不会表现为可见内容的跳动。
+    """
+
+    REALIZE_MARGIN = 1.0
+    MAX_REALIZE_PASSES = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 下面的设置就会触发 updateGeometries
+        self._realizing = False
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(False)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.verticalScrollBar().setSingleStep(20)
+        self.verticalScrollBar().valueChanged.connect(self.update_realized_range)
+
+    def updateGeometries(self) -> None:
+        # 每次布局完成和视口尺寸变化后都会调用
+        super().updateGeometries()
+        self.update_realized_range()
+
+    def update_realized_range(self) -> None:
+        """
+        视口上下各留 REALIZE_MARGIN 个视口高度作为预取区，区内的行实体化，区外的释放。
+        区内有行的精确高度与布局时不同则重新布局，新进入预取区的行再实体化，最多 MAX_REALIZE_PASSES 轮
+        """
+        delegate = self.itemDelegate()
+        model = self.model()
+        if self._realizing or not isinstance(delegate, ChatBubbleDelegate) or not isinstance(model, ChatListModel) \
+                or not model.message_count():
+            return
+        viewport = self.viewport()
+        margin = int(viewport.height() * self.REALIZE_MARGIN)
+        x = viewport.width() // 2
+        self._realizing = True
+        try:
+            for _ in range(self.MAX_REALIZE_PASSES):
+                first = self.indexAt(QPoint(x, -margin)).row()
+                last = self.indexAt(QPoint(x, viewport.height() + margin)).row()
+                # 预取区超出内容时 indexAt 返回无效索引，取到列表两端
+                if not delegate.realize(model, first if first >= 0 else 0, last if last >= 0 else model.message_count() - 1,
+                                        viewport.width(), viewport.devicePixelRatioF()):
+                    break
+                self._relayout_keeping_anchor()
+        finally:
+            self._realizing = False
+
+    def _relayout_keeping_anchor(self) -> None:
+        scrollbar = self.verticalScrollBar()
+        at_bottom = self.is_at_bottom()
+        anchor_row, anchor_top = self._top_anchor()
+        self.scheduleDelayedItemsLayout()
+        self.executeDelayedItemsLayout()
+        if at_bottom or anchor_row < 0:
+            scrollbar.setValue(scrollbar.maximum())
+        else:
+            rect = self.visualRect(self.model().index(anchor_row))
+            scrollbar.setValue(scrollbar.value() + rect.top() - anchor_top)
+
+    def is_at_bottom(self) -> bool:
+        scrollbar = self.verticalScrollBar()
+        return scrollbar.value() >= scrollbar.maximum()
+
+    def append_items(self, items: List[ConversationItem]) -> None:
+        """
+        在末尾（"正在输入"行之前）追加消息并滚动到底部。
+        scrollToBottom 会先完成挂起的布局，滚动条最大值已包含新消息的高度。
+        """
+        model: ChatListModel = self.model()
+        delegate = self.itemDelegate()
+        if isinstance(delegate, ChatBubbleDelegate):
+            # 新消息马上就会出现在视口中，直接按精确尺寸布局，免得实体化后再布局一次
+            delegate.realize_items(items)
+        model.insert_items(model.message_count(), items)
+        self.scrollToBottom()
+
+    def append_text(self, row: int, text: str) -> None:
+        """
+        向第 row 行追加文本。行高不变时只重绘这一行；换行导致行高变化时才请求重新布局
+        """
+        model: ChatListModel = self.model()
+        index = model.index(row)
+        old_height = self.visualRect(index).height()
+        model.append_text(row, text)
+        option = QStyleOptionViewItem()
+        self.initViewItemOption(option)
+        option.rect = self.visualRect(index)
+        delegate = self.itemDelegate()
+        if delegate.sizeHint(option, index).height() != old_height:
+            delegate.sizeHintChanged.emit(index)
+
+    def prepend_items(self, items: List[ConversationItem], replace_count: int = 0, scroll_to_bottom: bool = False) -> None:
+        """
+        在顶部批量插入一页历史记录，可同时替换掉顶部原有的 replace_count 行。
+
+        插入期间暂停重绘，插入后只做一次布局，再让插入前位于视口顶部的那一行回到原来的
+        像素位置，可见内容不会跳动；scroll_to_bottom 为 True 时（首次加载）改为滚动到底部。
+        滚动位置恢复之后才按新的视口实体化。
+        """
+        model: ChatListModel = self.model()
+        scrollbar = self.verticalScrollBar()
+        anchor_row, anchor_top = self._top_anchor(replace_count)
+        self.setUpdatesEnabled(False)
+        self._realizing = True
+        try:
+            if replace_count:
+                model.remove_items(0, replace_count)
+            model.insert_items(0, items)
+            self.executeDelayedItemsLayout()
+            if scroll_to_bottom or anchor_row < 0:
+                scrollbar.setValue(scrollbar.maximum())
+            else:
+                rect = self.visualRect(model.index(anchor_row - replace_count + len(items)))
+                scrollbar.setValue(scrollbar.value() + rect.top() - anchor_top)
+        finally:
+            self._realizing = False
+            self.setUpdatesEnabled(True)
+        self.update_realized_range()
+
+    def _top_anchor(self, replace_count: int = 0) -> Tuple[int, int]:
+        """
+        :return: (视口顶部所在的行, 该行顶边相对视口的 y)；被替换的行不能作为锚点，
+                 此时取替换区之后的第一行。没有可用的行时返回 (-1, 0)
+        """
+        index = self.indexAt(QPoint(self.viewport().width() // 2, 0))
+        if not index.isValid():
+            return -1, 0
+        row = max(index.row(), replace_count)
+        if row >= self.model().rowCount():
+            return -1, 0
+        return row, self.visualRect(self.model().index(row)).top()
@@ -0,0 +1,251 @@
+"""
+Live2D 渲染帧调度
+
+根据模型是否在活动（说话、拖拽、表情过渡）在高帧率和低帧率之间切换，
+窗口最小化、被隐藏或不可见时完全停止刷新，并统计实际帧率和帧间隔分布。
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from PySide6.QtCore import QEvent, QObject, Qt, QTimer, Signal
+from PySide6.QtOpenGLWidgets import QOpenGLWidget
+
+from ..utils.logger import get_logger
+
+
+class FrameStats:
+    """
+    最近若干帧的帧间隔统计：p50/p95/p99 以及掉帧数。
+    间隔超过预期间隔 1.5 倍即视为掉帧，按错过的刷新次数累计。
+    """
+
+    def __init__(self, capacity: int = 600):
+        self.intervals: Deque[float] = deque(maxlen=capacity)
+        self.expected_interval: float = 1 / 60
+        self.dropped: int = 0
+        self.frames: int = 0
+        self._last: Optional[float] = None
+
+    def reset(self, expected_interval: Optional[float] = None) -> None:
+        self.intervals.clear()
+        self.dropped = 0
+        self.frames = 0
+        self._last = None
+        if expected_interval:
+            self.expected_interval = expected_interval
+
+    def record(self, now: float) -> None:
+        self.frames += 1
+        if self._last is not None:
+            interval = now - self._last
+            self.intervals.append(interval)
+            if interval > self.expected_interval * 1.5:
+                self.dropped += int(round(interval / self.expected_interval)) - 1
+        self._last = now
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.intervals:
+            return {"frames": self.frames, "dropped": self.dropped}
+        p50, p95, p99 = np.percentile(np.fromiter(self.intervals, dtype=np.float64), [50, 95, 99]) * 1000
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "expected_ms": round(self.expected_interval * 1000, 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        }
+
+
+class FrameScheduler(QObject):
+    """
+    驱动 QOpenGLWidget 的 update()。
+
+    - active: 模型正在活动或最近有交互时，以 active_fps 刷新
+    - idle: 只剩自动眨眼、呼吸时，以 idle_fps 刷新
+    - paused: 控件不可见或窗口最小化时停止计时器，重新显示后自动恢复
+
+    pacing 为 "vsync" 时，active 状态不再使用计时器，而是在每次 frameSwapped 之后
+    请求下一帧，由交换间隔（见 ui_init）把帧率锁定在显示器刷新率上。
+
+    挂接了渲染线程（attach_render_thread）时，帧由渲染线程按本调度器给出的间隔自行产生，
+    计时器只用于在 GUI 线程中检查状态切换；渲染线程的 frame_ready 以排队连接送回 GUI 线程
+    再计入统计，帧率统计只在 GUI 线程中读写。
+    """
+
+    fps_changed = Signal(float)
+
+    def __init__(self, widget: QOpenGLWidget, is_animating: Callable[[], bool], render_config: Optional[Dict[str, Any]] = None):
+        super().__init__(widget)
+        render_config = render_config or {}
+        self.widget = widget
+        self.is_animating = is_animating
+        self.active_fps: int = render_config.get("active_fps", 60)
+        self.idle_fps: int = render_config.get("idle_fps", 20)
+        self.active_hold: float = render_config.get("active_hold_ms", 800) / 1000
+        self.pacing: str = render_config.get("pacing", "timer")
+        self.max_fps: int = 0  # 画质档位限制的最高帧率，0 表示不限制
+        self.logger = get_logger(self.__class__.__name__)
+
+        self.mode: str = "paused"
+        self.fps: float = 0.0
+        self._active_until: float = 0.0
+        self._frames: int = 0
+        self._window_start: float = time.perf_counter()
+        self._window = None
+        self._window_handle = None
+        self._vsync_driving: bool = False
+        self.render_thread = None
+        self.stats = FrameStats()
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        widget.frameSwapped.connect(self._on_frame_swapped)
+        widget.installEventFilter(self)
+
+    def start(self) -> None:
+        self._watch_window()
+        self._reschedule()
+
+    def attach_render_thread(self, render_thread) -> None:
+        self.render_thread = render_thread
+        # 信号在渲染线程中发出，本对象属于 GUI 线程，槽经事件循环排队执行
+        render_thread.frame_ready.connect(self.frame_presented)
+        self._reschedule()
+
+    def set_max_fps(self, max_fps: int) -> None:
+        self.max_fps = max_fps
+        self._reschedule(force=True)
+
+    def wake(self) -> None:
+        """
+        有用户交互时调用：立即切换到高帧率，并保持 active_hold 秒
+        """
+        self._active_until = time.perf_counter() + self.active_hold
+        if self.mode != "active":
+            self._reschedule()
+
+    def frame_presented(self, now: Optional[float] = None) -> None:
+        """
+        每次 paintGL 结束时调用，用于统计实际帧率；只能在 GUI 线程中调用
+        :param now: 帧完成的时刻，渲染线程的帧按其画完的时刻统计，不计排队延迟
+        """
+        self._frames += 1
+        if now is None:
+            now = time.perf_counter()
+        self.stats.record(now)
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._frames / elapsed
+            self._frames = 0
+            self._window_start = now
+            self.fps_changed.emit(self.fps)
+            self.logger.debug(f"Frame stats ({self.mode}, {self.fps:.1f} fps): {self.stats.summary()}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "target_fps": self._target_fps(),
+            "fps": round(self.fps, 1),
+            "pacing": "vsync" if self._vsync_driving else "timer",
+            "threaded": self.render_thread is not None,
+            "frame_stats": self.stats.summary(),
+        }
+
+    def _target_fps(self) -> int:
+        if self.mode == "active" and self.pacing == "vsync":
+            return int(round(self._refresh_rate()))
+        fps = {"active": self.active_fps, "idle": self.idle_fps}.get(self.mode, 0)
+        return min(fps, self.max_fps) if self.max_fps > 0 else fps
+
+    def _refresh_rate(self) -> float:
+        screen = self.widget.screen()
+        rate = screen.refreshRate() if screen else 0.0
+        return rate if rate > 0 else 60.0
+
+    def _can_render(self) -> bool:
+        if not self.widget.isVisible():
+            return False
+        window = self.widget.window()
+        if window.windowState() & Qt.WindowState.WindowMinimized:
+            return False
+        handle = window.windowHandle()
+        return handle is None or handle.isExposed()
+
+    def _next_mode(self) -> str:
+        if not self._can_render():
+            return "paused"
+        if time.perf_counter() < self._active_until or self.is_animating():
+            return "active"
+        return "idle"
+
+    def _reschedule(self, force: bool = False) -> None:
+        mode = self._next_mode()
+        vsync = mode == "active" and self.pacing == "vsync" and self.render_thread is None
+        running = self._vsync_driving or self._timer.isActive()
+        if not force and mode == self.mode and running == (mode != "paused"):
+            return
+        if mode != self.mode:
+            self.logger.debug(f"Frame scheduler: {self.mode} -> {mode}")
+            self.mode = mode
+        self._timer.stop()
+        self._vsync_driving = False
+        if self.render_thread is not None:
+            self.render_thread.set_interval(0.0 if mode == "paused" else 1 / self._target_fps())
+        if mode == "paused":
+            self.fps = 0.0
+            self._frames = 0
+            self.fps_changed.emit(self.fps)
+            return
+        self._window_start = time.perf_counter()
+        self._frames = 0
+        self.stats.reset(1 / self._target_fps())
+        if vsync:
+            # 之后每次交换完成都会请求下一帧
+            self._vsync_driving = True
+            self.widget.update()
+        else:
+            self._timer.start(max(1, int(1000 / self._target_fps())))
+
+    def _tick(self) -> None:
+        if self.render_thread is None:
+            self.widget.update()
+        if self._next_mode() != self.mode:
+            self._reschedule()
+
+    def _on_frame_swapped(self) -> None:
+        if not self._vsync_driving:
+            return
+        if self._next_mode() != self.mode:
+            self._reschedule()
+            return
+        self.widget.update()
+
+    def _watch_window(self) -> None:
+        window = self.widget.window()
+        if window is not self._window:
+            if self._window is not None and self._window is not self.widget:
+                self._window.removeEventFilter(self)
+            self._window = window
+            if window is not self.widget:
+                window.installEventFilter(self)
+        # 被其他窗口完全遮挡时只有 QWindow 会收到 Expose 事件
+        handle = window.windowHandle()
+        if handle is not None and handle is not self._window_handle:
+            if self._window_handle is not None:
+                self._window_handle.removeEventFilter(self)
+            self._window_handle = handle
+            handle.installEventFilter(self)
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() in (QEvent.Type.Show, QEvent.Type.Hide, QEvent.Type.WindowStateChange, QEvent.Type.Expose):
+            if event.type() == QEvent.Type.Show:
+                self._watch_window()
+            # 等 Qt 更新完可见性和窗口状态之后再判断
+            QTimer.singleShot(0, self._reschedule)
+        return False
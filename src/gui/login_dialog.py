@@ -7,13 +7,36 @@ from ..safety import credential
 from ..utils.logger import get_logger
 
 
+def attempt_auto_login(network_client: NetworkClient) -> bool:
+    """
+    不依赖界面的自动登录，可在后台线程中执行：
+    读取保存的凭据并用 token 登录，失败时清除保存的 token
+    """
+    logger = get_logger("LoginDialog")
+    try:
+        cred = credential.load_credentials()
+        if not cred:
+            return False
+        user_id, token, do_auto_login = cred
+        if not (do_auto_login and token and user_id):
+            return False
+        logger.info("Attempting auto login...")
+        if network_client.auto_login(user_id, token):
+            logger.info("Auto login successful")
+            return True
+        logger.info("Auto login failed")
+        credential.save_credentials(user_id, None, False)
+    except Exception as e:
+        logger.error(f"Auto login exception: {e}")
+    return False
+
+
 class LoginDialog(QDialog):
     def __init__(self, network_client: NetworkClient):
         super().__init__()
         self.logger = get_logger(self.__class__.__name__)
         self.network_client = network_client
         self.user_id = None
-        self.saved_token = None
         
         self.setWindowTitle("ChatWithLuoTianyi - 登录/注册")
         self.setFixedSize(400, 300)
@@ -35,26 +58,10 @@ class LoginDialog(QDialog):
         
         cred = credential.load_credentials()
         if cred:
-            user_id, token, do_auto_login = cred
+            # 自动登录由 attempt_auto_login 在显示对话框之前完成，这里只回填表单
+            user_id, _, do_auto_login = cred
             self.l_auto_login.setChecked(do_auto_login)
             self.l_username.setText(user_id or "")
-            self.saved_token = token
-
-    def try_auto_login(self) -> bool:
-        try:
-            if self.l_auto_login.isChecked() and self.saved_token and self.l_username.text():
-                self.logger.info("Attempting auto login...")
-                if self.network_client.auto_login(self.l_username.text(), self.saved_token):
-                    self.logger.info("Auto login successful")
-                    return True
-                else:
-                    self.logger.info("Auto login failed")
-                    self.saved_token = None
-                    self.l_auto_login.setChecked(False)
-                    credential.save_credentials(self.l_username.text(), None, False)
-        except Exception as e:
-            self.logger.error(f"Auto login exception: {e}")
-        return False
 
     def setup_login_ui(self):
         layout = QVBoxLayout()
@@ -1,18 +1,23 @@
 
 import sys
 import os
-import json
-from PySide6.QtCore import Qt, QTimerEvent, QSize, QRect, QEvent, QTimer, QPoint
-from PySide6.QtGui import QMouseEvent, QPainter, QColor, QImage, QPixmap, QResizeEvent, QSurfaceFormat, QFont, QFontMetrics, QTextOption, QIcon
+from PySide6.QtCore import Qt, QSize, QRect, QRectF, QEvent, QTimer, QPoint, Signal, QObject, QRunnable, QThreadPool
+from PySide6.QtGui import QMouseEvent, QPainter, QImage, QImageReader, QPixmap, QResizeEvent, QSurfaceFormat, QFont, QIcon
 from PySide6.QtWidgets import (QApplication, QWidget, QHBoxLayout, QVBoxLayout, 
-                               QTextEdit, QLineEdit, QScrollArea, QLabel, 
-                               QSizePolicy, QFrame, QPushButton, QFileDialog)
+                               QTextEdit, QLineEdit, QLabel, 
+                               QFrame, QPushButton, QFileDialog, QMenu)
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
-from OpenGL.GL import *
+from PySide6.QtOpenGL import QOpenGLTextureBlitter, QOpenGLFramebufferObject
+from OpenGL.GL import (glBindFramebuffer, glBlendFunc, glClear, glClearColor, glEnable, glViewport,
+                       GL_BLEND, GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_FRAMEBUFFER, GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
 from typing import Dict, Any, List, Optional
 
 from ..live2d import Live2dModel, live2d
 from .binder import AgentBinder
+from .frame_scheduler import FrameScheduler
+from .render_thread import Live2DRenderThread
+from .render_quality import RenderQuality, benchmark_render, create_framebuffer, current_renderer, scaled_size
+from .chat_view import ChatBubbleDelegate, ChatListModel, ChatListView, make_image_item, make_item
 from ..types import ConversationItem
 
 class Live2DWidget(QOpenGLWidget):
@@ -23,10 +28,46 @@ class Live2DWidget(QOpenGLWidget):
         self.model: Live2dModel = Live2dModel(live2d_config)
         agent_binder.model = self.model
         self.setMouseTracking(True)
+        self.render_config: Dict[str, Any] = live2d_config.get("render") or {}
+        self.threaded: bool = self.render_config.get("threaded", False)
+        self.frame_scheduler = FrameScheduler(self, self.model.is_animating, self.render_config)
+        self.render_thread: Optional[Live2DRenderThread] = None
+        self._blitter: Optional[QOpenGLTextureBlitter] = None
+
+        # 画质档位：内部渲染比例、MSAA、最高帧率
+        self.quality = RenderQuality(self.render_config)
+        self.render_scale: float = 1.0
+        self.samples: int = 0
+        self._scaled_fbo = None
+        self._resolve_fbo = None
+        tier = self.quality.tier
+        if not self.threaded and tier["msaa"]:
+            # 控件自身的多重采样只能在创建上下文之前设置，auto 模式下首次测试的结果下次启动生效
+            fmt = self.format()
+            fmt.setSamples(tier["msaa"])
+            self.setFormat(fmt)
+        self.apply_quality(tier)
 
     def initializeGL(self) -> None:
-        # Load model config
-        self.model.model_init()
+        self._blitter = QOpenGLTextureBlitter()
+        self._blitter.create()
+        if self.threaded:
+            # 模型在渲染线程中加载和绘制，这里只负责合成
+            self.render_thread = Live2DRenderThread(self.model, self.context(), quality=self.quality)
+            self.render_thread.frame_ready.connect(self.update)
+            self.render_thread.quality_changed.connect(self.apply_quality)
+            self.render_thread.resize(self.width(), self.height(), self.devicePixelRatioF())
+            QApplication.instance().aboutToQuit.connect(self.render_thread.stop)
+            self.render_thread.start()
+            self.frame_scheduler.attach_render_thread(self.render_thread)
+        else:
+            # Load model config
+            self.model.model_init()
+            renderer = current_renderer()
+            if self.quality.needs_benchmark(renderer):
+                size = scaled_size(self.width(), self.height(), self.devicePixelRatioF(), 1.0)
+                frame_ms = benchmark_render(self.model, size)
+                self.apply_quality(self.quality.choose(frame_ms, renderer))
 
         # Set clear color to transparent
         try:
@@ -34,10 +75,22 @@ class Live2DWidget(QOpenGLWidget):
         except Exception as e:
             print(f"initializeGL glClearColor error: {e}")
         
-        # Start update timer (approx 60 FPS)
-        self.startTimer(int(1000 / 60))
+        # 由帧调度器按活动状态决定刷新频率
+        self.frame_scheduler.start()
+
+    def apply_quality(self, tier: Dict[str, Any]) -> None:
+        self.render_scale = tier["render_scale"]
+        self.samples = tier["msaa"]
+        self._scaled_fbo = None
+        self._resolve_fbo = None
+        self.frame_scheduler.set_max_fps(tier["max_fps"])
+        if self.render_thread:
+            self.render_thread.set_quality(self.render_scale, self.samples)
 
     def resizeGL(self, w: int, h: int) -> None:
+        if self.render_thread:
+            self.render_thread.resize(w, h, self.devicePixelRatioF())
+            return
         glViewport(0, 0, w, h)
         if self.model:
             self.model.Resize(w, h)
@@ -50,26 +103,100 @@ class Live2DWidget(QOpenGLWidget):
         except Exception as e:
             print(f"paintGL error: {e}")
             pass
+
+        if self.render_thread:
+            with self.render_thread.front_texture() as texture:
+                self.composite_frame(texture)
+            return
         
         if self.model:
             self.model.Update()
-            self.model.Draw()
+            if self.render_scale < 1.0:
+                self.draw_scaled()
+            else:
+                self.model.Draw()
+        self.frame_scheduler.frame_presented()
+
+    def draw_scaled(self) -> None:
+        """
+        以 render_scale 的分辨率离屏绘制，再放大贴回控件
+        """
+        size = scaled_size(self.width(), self.height(), self.devicePixelRatioF(), self.render_scale)
+        if self._scaled_fbo is None or self._scaled_fbo.size() != size:
+            self._scaled_fbo = create_framebuffer(size, self.samples)
+            self._resolve_fbo = create_framebuffer(size) if self.samples else None
+        self._scaled_fbo.bind()
+        glViewport(0, 0, size.width(), size.height())
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.model.Draw()
+        self._scaled_fbo.release()
+        target = self._scaled_fbo
+        if self._resolve_fbo is not None:
+            QOpenGLFramebufferObject.blitFramebuffer(self._resolve_fbo, self._scaled_fbo)
+            target = self._resolve_fbo
+        glBindFramebuffer(GL_FRAMEBUFFER, self.defaultFramebufferObject())
+        glViewport(0, 0, round(self.width() * self.devicePixelRatioF()), round(self.height() * self.devicePixelRatioF()))
+        self.composite_frame(target.texture())
+
+    def composite_frame(self, texture: int) -> None:
+        """
+        把一帧离屏结果（预乘 alpha）贴满整个控件
+        """
+        if not texture:
+            return
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        self._blitter.bind()
+        target = QOpenGLTextureBlitter.targetTransform(QRectF(self.rect()), self.rect())
+        self._blitter.blit(texture, target, QOpenGLTextureBlitter.Origin.OriginBottomLeft)
+        self._blitter.release()
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         if not self.model:
             return
         x, y = event.position().x(), event.position().y()
-        if self.model.HitTest("头", x, y):
-            self.model.set_next_expression()
+        self.frame_scheduler.wake()
+        self.model.post_tap(x, y)
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         if not self.model:
             return
         x, y = event.position().x() - self.x(), event.position().y() - self.y()
         self.model.Drag(x, y)
+        self.frame_scheduler.wake()
 
-    def timerEvent(self, event: QTimerEvent) -> None:
-        self.update()
+    def leaveEvent(self, event) -> None:
+        if self.model:
+            self.model.post_drag_release()
+        super().leaveEvent(event)
+
+class BackgroundDecoderSignals(QObject):
+    decoded = Signal(QImage)
+
+class BackgroundDecoder(QRunnable):
+    """
+    在线程池中解码背景图，过大的图片在解码时直接缩小到不超过 max_size。
+    结果通过调用方持有的 signals 发出，任务 run() 返回后由线程池删除
+    """
+
+    def __init__(self, path: str, max_size: QSize, signals: BackgroundDecoderSignals):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.signals = signals
+
+    def run(self):
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid() and (size.width() > self.max_size.width() or size.height() > self.max_size.height()):
+            # 保持比例并保证能覆盖 max_size（裁剪时还需要多出来的部分）
+            reader.setScaledSize(size.scaled(self.max_size, Qt.AspectRatioMode.KeepAspectRatioByExpanding))
+        image = reader.read()
+        if image.isNull():
+            print(f"Warning: Failed to decode background {self.path}: {reader.errorString()}")
+            return
+        self.signals.decoded.emit(image)
 
 class Live2DContainer(QWidget):
     def __init__(self, gui_config, live2d_config, agent_binder: AgentBinder, parent=None):
@@ -77,16 +204,30 @@ class Live2DContainer(QWidget):
         self.live2d_widget = Live2DWidget(live2d_config, agent_binder = agent_binder, parent=self)
         self.gui_config = gui_config
         self.live2d_config: Dict[str, Any] = live2d_config
-        self.background_image = None
+        self.background_image: Optional[QImage] = None
+        # 按 (控件尺寸, 设备像素比) 缓存裁剪并缩放好的背景
+        self._background_pixmap: Optional[QPixmap] = None
+        self._background_key = None
+        self._background_signals = BackgroundDecoderSignals(self)
+        self._background_signals.decoded.connect(self.on_background_decoded)
         self.load_background()
         
     def load_background(self):
         bg_path = self.gui_config["live2d_background"]["image_path"]
         if os.path.exists(bg_path):
-            self.background_image = QImage(bg_path)
+            # 异步解码，完成前先画黑色
+            screen = self.screen() or QApplication.primaryScreen()
+            max_size = screen.size() * screen.devicePixelRatio() if screen else QSize(2560, 1440)
+            QThreadPool.globalInstance().start(BackgroundDecoder(bg_path, max_size, self._background_signals))
         else:
             print(f"Warning: Background not found at {bg_path}")
 
+    def on_background_decoded(self, image: QImage):
+        self.background_image = image
+        self._background_pixmap = None
+        self._background_key = None
+        self.update()
+
     def resizeEvent(self, event: QResizeEvent):
         # Maintain 3:4 aspect ratio for the content area
         # But this widget is the container, it might be resized by the layout.
@@ -103,164 +244,58 @@ class Live2DContainer(QWidget):
         self.live2d_widget.resize(self.size())
         super().resizeEvent(event)
 
+    def background_pixmap(self) -> Optional[QPixmap]:
+        """
+        取得铺满控件（AspectFill）的背景；只有尺寸或设备像素比变化时才重新裁剪缩放
+        """
+        if self.background_image is None or self.width() <= 0 or self.height() <= 0:
+            return None
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr)
+        if key == self._background_key:
+            return self._background_pixmap
+
+        target_w = max(1, round(self.width() * dpr))
+        target_h = max(1, round(self.height() * dpr))
+        img_w = self.background_image.width()
+        img_h = self.background_image.height()
+
+        widget_ratio = target_w / target_h
+        img_ratio = img_w / img_h
+
+        source_rect = QRect(0, 0, img_w, img_h)
+
+        if widget_ratio > img_ratio:
+            # Widget is wider than image. Crop top/bottom.
+            new_h = int(img_w / widget_ratio)
+            center_y = img_h // 2
+            source_rect.setTop(center_y - new_h // 2)
+            source_rect.setHeight(new_h)
+        else:
+            # Widget is taller than image. Crop left/right.
+            new_w = int(img_h * widget_ratio)
+            center_x = img_w // 2
+            source_rect.setLeft(center_x - new_w // 2)
+            source_rect.setWidth(new_w)
+
+        scaled = self.background_image.copy(source_rect).scaled(
+            target_w, target_h, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+        )
+        pixmap = QPixmap.fromImage(scaled)
+        pixmap.setDevicePixelRatio(dpr)
+        self._background_pixmap = pixmap
+        self._background_key = key
+        return pixmap
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        if self.background_image:
-            # Draw background, cropping to fill (AspectFill)
-            # Target rect is self.rect()
-            # Source rect needs to be calculated
-            
-            target_rect = self.rect()
-            img_w = self.background_image.width()
-            img_h = self.background_image.height()
-            
-            widget_ratio = target_rect.width() / target_rect.height()
-            img_ratio = img_w / img_h
-            
-            source_rect = QRect(0, 0, img_w, img_h)
-            
-            if widget_ratio > img_ratio:
-                # Widget is wider than image. Crop top/bottom.
-                new_h = int(img_w / widget_ratio)
-                center_y = img_h // 2
-                source_rect.setTop(center_y - new_h // 2)
-                source_rect.setHeight(new_h)
-            else:
-                # Widget is taller than image. Crop left/right.
-                new_w = int(img_h * widget_ratio)
-                center_x = img_w // 2
-                source_rect.setLeft(center_x - new_w // 2)
-                source_rect.setWidth(new_w)
-                
-            painter.drawImage(target_rect, self.background_image, source_rect)
+        pixmap = self.background_pixmap()
+        if pixmap is not None:
+            # 预先缩放好的像素图按 1:1 绘制，不再逐帧缩放原图
+            painter.drawPixmap(0, 0, pixmap)
         else:
             painter.fillRect(self.rect(), Qt.GlobalColor.black)
 
-class ChatImageBubble(QWidget):
-    def __init__(self, image_path, is_user=False, parent=None):
-        super().__init__(parent)
-        self.is_user = is_user
-        self.image_path = image_path
-        self.init_ui()
-
-    def init_ui(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
-        
-        self.image_label = QLabel()
-        self.image_label.setStyleSheet("background-color: transparent;")
-        
-        # Load and scale image
-        pixmap = QPixmap(self.image_path)
-        if not pixmap.isNull():
-            max_width = 250
-            max_height = 250
-            
-            w = pixmap.width()
-            h = pixmap.height()
-            
-            if w > max_width or h > max_height:
-                pixmap = pixmap.scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            
-            self.image_label.setPixmap(pixmap)
-        else:
-            self.image_label.setText("Image not found")
-        
-        # Alignment
-        if self.is_user:
-            layout.addStretch()
-            layout.addWidget(self.image_label)
-        else:
-            layout.addWidget(self.image_label)
-            layout.addStretch()
-            
-        self.setLayout(layout)
-        self.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
-
-class ChatBubble(QWidget):
-    def __init__(self, text, is_user=False, parent=None):
-        super().__init__(parent)
-        self.is_user = is_user
-        self.text = text
-        self.init_ui()
-
-    def init_ui(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
-        
-        self.text_edit = QTextEdit()
-        self.text_edit.setReadOnly(True)
-        self.text_edit.setText(self.text)
-        self.text_edit.setFrameShape(QFrame.Shape.NoFrame)
-        self.text_edit.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.text_edit.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.text_edit.setWordWrapMode(QTextOption.WrapMode.WrapAnywhere)
-        self.text_edit.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
-        self.text_edit.document().setDocumentMargin(0)
-        
-        # Style
-        bg_color = "#FFFFFF" if self.is_user else "#88EDFF"
-        text_color = "#000000"
-        
-        style = f"""
-            QTextEdit {{
-                background-color: {bg_color};
-                color: {text_color};
-                border-radius: 10px;
-                padding: 10px;
-                font-size: 16px;
-            }}
-        """
-        self.text_edit.setStyleSheet(style)
-        
-        # Alignment
-        if self.is_user:
-            layout.addStretch()
-            layout.addWidget(self.text_edit)
-        else:
-            layout.addWidget(self.text_edit)
-            layout.addStretch()
-            
-        self.setLayout(layout)
-        self.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
-
-    def set_text(self, text):
-        self.text = text
-        self.text_edit.setText(text)
-        self.update_bubble_size()
-
-    def resizeEvent(self, event):
-        self.update_bubble_size()
-        super().resizeEvent(event)
-
-    def update_bubble_size(self):
-        max_w = int(self.width() * 0.6)
-        if max_w <= 0: return
-
-        font = self.text_edit.font()
-        font.setPixelSize(16)
-        fm = QFontMetrics(font)
-        
-        lines = self.text.split('\n')
-        text_width = max([fm.horizontalAdvance(line) for line in lines]) if lines else 0
-        
-        target_width = text_width + 22 # Padding buffer
-        
-        final_width = min(target_width, max_w)
-        final_width = max(final_width, 50) # Minimum width
-        
-        self.text_edit.setFixedWidth(final_width)
-        
-        # Adjust height
-        doc = self.text_edit.document()
-        doc.setTextWidth(final_width - 20) # Subtract padding
-        
-        doc_h = doc.size().height()
-        final_height = int(doc_h + 20) 
-        
-        self.text_edit.setFixedHeight(final_height)
-        self.setFixedHeight(final_height + 10)
-
 class CustomToolTip(QLabel):
     def __init__(self, text, parent=None):
         super().__init__(text, parent)
@@ -315,9 +350,8 @@ class ChatWidget(QWidget):
         super().__init__(parent)
         self.config = config if config is not None else {}
         self.agent = agent_binder if agent_binder is not None else AgentBinder()
-        self.agent.response_signal.connect(self.on_agent_response)
-        self.agent.update_signal.connect(self.on_agent_update)
-        self.agent.delete_signal.connect(self.on_agent_delete)
+        self.agent.reply_delta_signal.connect(self.on_reply_delta)
+        self.agent.thinking_signal.connect(self.on_agent_thinking_changed)
         self.agent.free_signal.connect(self.on_agent_free_status_changed)
         
         # History loading
@@ -326,6 +360,16 @@ class ChatWidget(QWidget):
         self.current_history_index = -1
         self.is_loading_history = False
         self.first_load = True
+        self.cached_history_count = 0  # 顶部显示的本地缓存历史条数，服务器结果到达后可能被替换
+
+        # 流式回复：片段按帧合并，追加到当前回复所在的那一行
+        self._pending_deltas: List[tuple] = []
+        self._active_reply_turn: Optional[int] = None
+        self._active_reply_item: Optional[ConversationItem] = None
+        self._delta_timer = QTimer(self)
+        self._delta_timer.setSingleShot(True)
+        self._delta_timer.setInterval(16)
+        self._delta_timer.timeout.connect(self.flush_reply_deltas)
 
         self.init_ui()
 
@@ -353,10 +397,19 @@ class ChatWidget(QWidget):
         layout.setSpacing(0)
         
         # History Area
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
+        self.history_model = ChatListModel(self)
+        self.history_view = ChatListView()
+        self.history_view.setModel(self.history_model)
+        self.history_delegate = ChatBubbleDelegate(
+            self.history_view,
+            font_size=self.config.get("font_size", 16),
+            thumbnail_cache_dir=self.config.get("thumbnail_cache_dir", "temp/thumbnails"),
+            thumbnail_cache_max_mb=self.config.get("thumbnail_cache_max_mb", 100),
+        )
+        self.history_view.setItemDelegate(self.history_delegate)
+        self.history_view.customContextMenuRequested.connect(self.show_history_context_menu)
+        self.history_view.setStyleSheet("""
+            QListView {
                 background-color: transparent;
                 border: none;
             }
@@ -385,14 +438,7 @@ class ChatWidget(QWidget):
                 background: none;
             }
         """)
-        
-        self.history_container = QWidget()
-        self.history_container.setStyleSheet("background-color: transparent;")
-        self.history_layout = QVBoxLayout(self.history_container)
-        self.history_layout.addStretch() # Push messages to bottom
-        
-        self.scroll_area.setWidget(self.history_container)
-        self.scroll_area.verticalScrollBar().valueChanged.connect(self.on_scroll_value_changed)
+        self.history_view.verticalScrollBar().valueChanged.connect(self.on_scroll_value_changed)
         
         # Horizontal Line
         self.h_line = QFrame()
@@ -445,7 +491,7 @@ class ChatWidget(QWidget):
         self.agent_free = True
         self.update_send_button_state()
         
-        layout.addWidget(self.scroll_area)
+        layout.addWidget(self.history_view)
         layout.addWidget(self.h_line)
         layout.addWidget(self.toolbar)
         layout.addWidget(self.h_line_2)
@@ -459,42 +505,25 @@ class ChatWidget(QWidget):
             self.is_loading_history = True
             self.agent.load_history(self.load_history_num, self.current_history_index)
 
-    def on_history_loaded(self, history_list: List[ConversationItem], start_index):
-        self.is_loading_history = False
+    def on_history_loaded(self, history_list: List[ConversationItem], start_index, from_cache: bool = False):
+        replace_count = 0
+        if not from_cache:
+            self.is_loading_history = False
+            cached_count, self.cached_history_count = self.cached_history_count, 0
+            if cached_count and history_list:
+                # 服务器返回的最新一页与本地缓存不同，替换掉先前显示的缓存内容
+                replace_count = cached_count
+                self.first_load = True
+        else:
+            self.cached_history_count = len(history_list)
         if not history_list:
             return
-            
+
         self.current_history_index = start_index
-        
-        # Save scroll position
-        scrollbar = self.scroll_area.verticalScrollBar()
-        old_max = scrollbar.maximum()
-        old_value = scrollbar.value()
-        
-        # Prepend messages
-        for item in reversed(history_list):
-            item_type = item.type
-            is_user = (item.source == "user")
-            if item_type == "picture":
-                content_dict = json.loads(item.content)
-                image_path = content_dict.get("image_client_path")
-                bubble = ChatImageBubble(image_path, is_user)
-            else:
-                bubble = ChatBubble(item.content, is_user)
-            self.history_layout.insertWidget(0, bubble)
-            
-        # Restore scroll position
-        QApplication.processEvents()
-        new_max = scrollbar.maximum()
-        
-        if self.first_load:
-            # Use QTimer to ensure layout is updated and scrollbar max is correct
-            QTimer.singleShot(50, lambda: scrollbar.setValue(scrollbar.maximum()))
-            self.first_load = False
-        elif old_max != new_max:
-             QTimer.singleShot(50, lambda: scrollbar.setValue(old_value + scrollbar.maximum() - old_max))
-        else:
-            QTimer.singleShot(50, lambda: scrollbar.setValue(scrollbar.maximum() - old_max))
+
+        # 整页插入到顶部，一次布局；首次加载滚动到底部，否则保持当前可见内容不动
+        self.history_view.prepend_items(history_list, replace_count=replace_count, scroll_to_bottom=self.first_load)
+        self.first_load = False
 
     def on_text_changed(self):
         self.can_send = bool(self.input_box.toPlainText().strip()) and self.agent_free
@@ -553,24 +582,12 @@ class ChatWidget(QWidget):
             "", 
             "Images (*.png *.xpm *.jpg *.jpeg *.bmp *.svg)"
         )
-        if file_path:
-            self.can_send_pic = False
-            self.can_send = False
-            self.update_send_button_state()
-            self.update_send_pic_button_state()
+        if file_path and self.agent.hear_picture(file_path):
             self.add_image_message(file_path, is_user=True)
-            self.agent.hear_picture(file_path)
             
 
     def add_image_message(self, image_path, is_user):
-        bubble = ChatImageBubble(image_path, is_user)
-        # Insert before the stretch item (which is the last item)
-        self.history_layout.insertWidget(self.history_layout.count() - 1, bubble)
-        
-        # Scroll to bottom
-        QApplication.processEvents() # Ensure layout updates
-        # Use singleShot to scroll after layout ensures the new height is calculated
-        QTimer.singleShot(50, lambda: self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum()))
+        self.history_view.append_items([make_image_item(image_path, is_user)])
 
     def eventFilter(self, obj, event):
         if obj == self.input_box:
@@ -592,46 +609,76 @@ class ChatWidget(QWidget):
         if not text:
             return
         
+        if not self.agent.hear(text):
+            return
         self.add_message(text, is_user=True)
         self.input_box.clear()
-        
-        self.agent.hear(text)
-
-    def on_agent_response(self, text):
-        self.add_message(text, is_user=False)
-
-        QApplication.processEvents() # Ensure layout updates
-        self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
-
-    def on_agent_update(self, text):
-        count = self.history_layout.count()
-        if count > 1:
-            item = self.history_layout.itemAt(count - 2)
-            widget = item.widget()
-            if isinstance(widget, ChatBubble):
-                widget.set_text(text)
-                QApplication.processEvents()
-                self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
-    
-    def on_agent_delete(self):
-        count = self.history_layout.count()
-        if count > 1:
-            item = self.history_layout.itemAt(count - 2)
-            widget = item.widget()
-            if isinstance(widget, ChatBubble):
-                widget.setParent(None)
-                widget.deleteLater()
-                QApplication.processEvents()
-                self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
+
+    def on_reply_delta(self, turn_id: int, text: str):
+        # 同一帧内到达的片段合并后一次写入模型
+        self._pending_deltas.append((turn_id, text))
+        if not self._delta_timer.isActive():
+            self._delta_timer.start()
+
+    def flush_reply_deltas(self):
+        pending, self._pending_deltas = self._pending_deltas, []
+        follow = self.history_view.is_at_bottom()
+        for turn_id, text in pending:
+            row = self.history_model.message_count() - 1
+            item = self.history_model.item(row)
+            if turn_id == self._active_reply_turn and item is self._active_reply_item:
+                self.history_view.append_text(row, text)
+                continue
+            # 新的一轮回复，或者回复中途插入了其他消息：另起一条
+            self._active_reply_item = make_item("agent", text)
+            self._active_reply_turn = turn_id
+            self.history_model.append_item(self._active_reply_item)
+            follow = True
+        if follow:
+            self.history_view.scrollToBottom()
+
+    def on_agent_thinking_changed(self, thinking: bool):
+        if thinking:
+            self.show_typing_indicator()
+        else:
+            self.hide_typing_indicator()
+
+    def show_typing_indicator(self):
+        if self.history_model.typing:
+            return
+        # "正在输入"行始终位于模型末尾
+        self.history_model.set_typing(True)
+        self.history_view.scrollToBottom()
+
+    def hide_typing_indicator(self):
+        self.history_model.set_typing(False)
+
+    def show_history_context_menu(self, pos):
+        index = self.history_view.indexAt(pos)
+        item = self.history_model.item(index.row()) if index.isValid() else None
+        if item is None or item.type == "picture":
+            return
+        menu = QMenu(self.history_view)
+        copy_action = menu.addAction("复制")
+        copy_action.triggered.connect(lambda: QApplication.clipboard().setText(item.content))
+        if item.source != "user":
+            menu.addSeparator()
+            replay_action = menu.addAction("重播语音")
+            sentences = self.history_model.segments(item)
+            replay_action.setEnabled(self.can_replay(sentences))
+            replay_action.triggered.connect(lambda: self.on_replay_requested(sentences))
+        menu.exec(self.history_view.viewport().mapToGlobal(pos))
+        menu.deleteLater()
+
+    def can_replay(self, sentences) -> bool:
+        return self.agent.is_idle() and self.agent.has_cached_audio(sentences)
+
+    def on_replay_requested(self, sentences):
+        if self.can_replay(sentences):
+            self.agent.replay(sentences)
 
     def add_message(self, text, is_user):
-        bubble = ChatBubble(text, is_user)
-        # Insert before the stretch item (which is the last item)
-        self.history_layout.insertWidget(self.history_layout.count() - 1, bubble)
-        
-        # Scroll to bottom
-        QApplication.processEvents() # Ensure layout updates
-        self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
+        self.history_view.append_items([make_item("user" if is_user else "agent", text)])
 
 class MainWindow(QWidget):
     def __init__(self, gui_config, live2d_config, ui_binder: AgentBinder):
@@ -0,0 +1,143 @@
+"""
+Live2D 渲染画质分级
+
+每个档位规定内部渲染比例、MSAA 采样数和最高帧率。auto 模式在首次启动时对
+Update()/Draw() 做一次简短的基准测试并选择档位，结果按显卡（GL_RENDERER）保存，
+换显卡或驱动后会重新测试。软件渲染（如 Mesa llvmpipe）下同样适用。
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from PySide6.QtCore import QSize
+from PySide6.QtOpenGL import QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+from OpenGL.GL import (glBindTexture, glClear, glClearColor, glFinish, glGetString, glTexParameteri, glViewport,
+                       GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_LINEAR, GL_RENDERER, GL_TEXTURE_2D,
+                       GL_TEXTURE_MAG_FILTER, GL_TEXTURE_MIN_FILTER)
+
+from ..utils.logger import get_logger
+
+QUALITY_TIERS: Dict[str, Dict[str, Any]] = {
+    "high": {"render_scale": 1.0, "msaa": 4, "max_fps": 60},
+    "medium": {"render_scale": 0.75, "msaa": 2, "max_fps": 45},
+    "low": {"render_scale": 0.5, "msaa": 0, "max_fps": 30},
+}
+
+# 基准测试中单帧 Update+Draw 耗时（毫秒）不超过该值时选用对应档位，按顺序匹配
+BENCHMARK_THRESHOLDS = (("high", 6.0), ("medium", 14.0))
+
+
+def create_framebuffer(size: QSize, samples: int = 0) -> QOpenGLFramebufferObject:
+    """
+    创建带深度/模板缓冲的 FBO；非多重采样时把纹理设为线性过滤，便于缩放后贴图
+    """
+    fbo_format = QOpenGLFramebufferObjectFormat()
+    fbo_format.setAttachment(QOpenGLFramebufferObject.Attachment.CombinedDepthStencil)
+    fbo_format.setSamples(samples)
+    fbo = QOpenGLFramebufferObject(size, fbo_format)
+    if samples == 0:
+        glBindTexture(GL_TEXTURE_2D, fbo.texture())
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glBindTexture(GL_TEXTURE_2D, 0)
+    return fbo
+
+
+def scaled_size(w: int, h: int, device_pixel_ratio: float, render_scale: float) -> QSize:
+    return QSize(max(1, round(w * device_pixel_ratio * render_scale)), max(1, round(h * device_pixel_ratio * render_scale)))
+
+
+def benchmark_render(model, size: QSize, frames: int = 30, time_budget: float = 1.5) -> float:
+    """
+    在当前上下文中把模型离屏绘制若干帧，返回平均每帧 Update+Draw 的毫秒数；
+    超过 time_budget 秒提前结束，避免在很慢的机器上卡住启动
+    """
+    fbo = create_framebuffer(size)
+    fbo.bind()
+    glViewport(0, 0, size.width(), size.height())
+    glClearColor(0, 0, 0, 0)
+    glFinish()
+    count = 0
+    start = time.perf_counter()
+    while count < frames and time.perf_counter() - start < time_budget:
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        model.Update()
+        model.Draw()
+        glFinish()
+        count += 1
+    elapsed = time.perf_counter() - start
+    fbo.release()
+    return elapsed / max(count, 1) * 1000
+
+
+def current_renderer() -> str:
+    renderer = glGetString(GL_RENDERER)
+    return renderer.decode("utf-8", "replace") if isinstance(renderer, bytes) else str(renderer or "")
+
+
+class RenderQuality:
+    """
+    解析 live2d.render.quality（"auto" 或档位名），并管理 auto 模式的基准测试结果
+    """
+
+    DEFAULT_TIER = "medium"
+
+    def __init__(self, render_config: Optional[Dict[str, Any]] = None):
+        render_config = render_config or {}
+        self.logger = get_logger(self.__class__.__name__)
+        self.mode: str = render_config.get("quality", "auto")
+        self.cache_path: str = render_config.get("quality_cache", "temp/render_quality.json")
+        self.stored: Dict[str, Any] = self._load() if self.mode == "auto" else {}
+        if self.mode in QUALITY_TIERS:
+            self.tier_name = self.mode
+        else:
+            if self.mode != "auto":
+                self.logger.warning(f"未知的画质档位 {self.mode}，使用 auto")
+                self.mode = "auto"
+            self.tier_name = self.stored.get("tier", self.DEFAULT_TIER)
+            if self.tier_name not in QUALITY_TIERS:
+                self.tier_name = self.DEFAULT_TIER
+
+    @property
+    def tier(self) -> Dict[str, Any]:
+        return QUALITY_TIERS[self.tier_name]
+
+    def needs_benchmark(self, renderer: str) -> bool:
+        """
+        auto 模式下，没有保存过结果或显卡发生变化时需要重新测试（需在 GL 上下文中调用）
+        """
+        return self.mode == "auto" and self.stored.get("renderer") != renderer
+
+    def choose(self, frame_ms: float, renderer: str) -> Dict[str, Any]:
+        """
+        根据基准测试结果选择档位并保存
+        """
+        self.tier_name = "low"
+        for name, limit in BENCHMARK_THRESHOLDS:
+            if frame_ms <= limit:
+                self.tier_name = name
+                break
+        self.stored = {"tier": self.tier_name, "renderer": renderer, "frame_ms": round(frame_ms, 2)}
+        self.logger.info(f"Render benchmark on {renderer}: {frame_ms:.2f} ms/frame -> {self.tier_name}")
+        self._save()
+        return self.tier
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取画质测试结果失败: {e}")
+            return {}
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(self.stored, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            self.logger.warning(f"保存画质测试结果失败: {e}")
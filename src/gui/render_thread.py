@@ -0,0 +1,186 @@
+"""
+Live2D 独立渲染线程
+
+模型在自己的 OpenGL 上下文（与控件共享）和线程中 Update/Draw 到离屏 FBO，
+控件的 paintGL 只负责把最近完成的一帧贴到屏幕上，聊天区的布局卡顿不再打断动画节奏。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtGui import QOffscreenSurface, QOpenGLContext
+from PySide6.QtOpenGL import QOpenGLFramebufferObject
+from OpenGL.GL import glClear, glClearColor, glFinish, glViewport, GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT
+
+from ..live2d import Live2dModel
+from .render_quality import RenderQuality, benchmark_render, create_framebuffer, current_renderer, scaled_size
+from ..utils.logger import get_logger
+
+
+class Live2DRenderThread(QThread):
+    """
+    三缓冲的离屏渲染线程。
+
+    渲染线程只写 back，完成后与 ready 交换；GUI 线程在合成时把 ready 换到 front，
+    因此正在被屏幕采样的 front 永远不会被渲染线程覆盖。
+    帧间隔由 FrameScheduler 通过 set_interval 设置，0 表示暂停。
+    每完成一帧发出 frame_ready(完成时刻)，由 GUI 线程中的槽重绘控件、统计帧率，
+    渲染线程本身不读写调度器的状态。
+    开启 MSAA 时先画到多重采样缓冲，再解析到 back。
+    """
+
+    frame_ready = Signal(float)  # 这一帧画完时的 time.perf_counter()
+    quality_changed = Signal(dict)  # auto 画质的基准测试完成后发出选中的档位
+
+    def __init__(self, model: Live2dModel, share_context: QOpenGLContext,
+                 quality: Optional[RenderQuality] = None, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.quality = quality
+        self.logger = get_logger(self.__class__.__name__)
+
+        # 上下文和离屏表面必须在 GUI 线程中创建，之后把上下文移交给渲染线程
+        self.context = QOpenGLContext()
+        self.context.setFormat(share_context.format())
+        self.context.setShareContext(share_context)
+        if not self.context.create():
+            raise RuntimeError("无法创建 Live2D 渲染上下文")
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        self.context.moveToThread(self)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running: bool = True
+        self._interval: float = 0.0
+        self._size: Tuple[int, int, float] = (1, 1, 1.0)
+        self._size_dirty: bool = True
+        self._render_scale: float = 1.0
+        self._samples: int = 0
+        self._fbos: List[Optional[QOpenGLFramebufferObject]] = [None, None, None]
+        self._msaa_fbo: Optional[QOpenGLFramebufferObject] = None
+        self._back, self._ready, self._front = 0, 1, 2
+        self._has_new: bool = False
+        self._has_frame: bool = False
+
+    # ---- GUI 线程调用 ----
+
+    def set_interval(self, interval: float) -> None:
+        self._interval = interval
+        self._wake.set()
+
+    def resize(self, w: int, h: int, device_pixel_ratio: float = 1.0) -> None:
+        with self._lock:
+            self._size = (max(w, 1), max(h, 1), device_pixel_ratio)
+            self._size_dirty = True
+        self._wake.set()
+
+    def set_quality(self, render_scale: float, samples: int) -> None:
+        with self._lock:
+            if (render_scale, samples) == (self._render_scale, self._samples):
+                return
+            self._render_scale = render_scale
+            self._samples = samples
+            self._size_dirty = True
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+        self.wait()
+
+    @contextmanager
+    def front_texture(self) -> Iterator[int]:
+        """
+        取出最近完成的一帧对应的纹理 ID（没有可用帧时为 0）；
+        在 with 块内渲染线程不会重建缓冲区
+        """
+        with self._lock:
+            if self._has_new:
+                self._ready, self._front = self._front, self._ready
+                self._has_new = False
+            fbo = self._fbos[self._front]
+            yield fbo.texture() if fbo is not None and self._has_frame else 0
+
+    # ---- 渲染线程 ----
+
+    def run(self) -> None:
+        self.context.makeCurrent(self.surface)
+        try:
+            self.model.model_init()
+            self._run_benchmark()
+            next_frame = time.perf_counter()
+            while self._running:
+                interval = self._interval
+                if interval <= 0:
+                    self._wake.wait()
+                    self._wake.clear()
+                    next_frame = time.perf_counter()
+                    continue
+                self._render()
+                next_frame += interval
+                delay = next_frame - time.perf_counter()
+                if delay <= 0:
+                    # 落后时从当前时间重新计时，不连续补帧
+                    next_frame = time.perf_counter()
+                elif self._wake.wait(delay):
+                    self._wake.clear()
+        except Exception as e:
+            self.logger.error(f"Live2D render thread error: {e}")
+        finally:
+            with self._lock:
+                self._fbos = [None, None, None]
+                self._msaa_fbo = None
+                self._has_frame = False
+            self.context.doneCurrent()
+
+    def _run_benchmark(self) -> None:
+        if self.quality is None:
+            return
+        renderer = current_renderer()
+        if not self.quality.needs_benchmark(renderer):
+            return
+        with self._lock:
+            w, h, dpr = self._size
+        self.model.Resize(w, h)
+        frame_ms = benchmark_render(self.model, scaled_size(w, h, dpr, 1.0))
+        tier: Dict[str, Any] = self.quality.choose(frame_ms, renderer)
+        self.set_quality(tier["render_scale"], tier["msaa"])
+        self.quality_changed.emit(tier)
+
+    def _recreate_buffers(self) -> None:
+        with self._lock:
+            w, h, dpr = self._size
+            self._size_dirty = False
+            size = scaled_size(w, h, dpr, self._render_scale)
+            self._fbos = [create_framebuffer(size) for _ in range(3)]
+            self._msaa_fbo = create_framebuffer(size, self._samples) if self._samples else None
+            self._has_new = False
+            self._has_frame = False
+        self.model.Resize(w, h)
+
+    def _render(self) -> None:
+        if self._size_dirty:
+            self._recreate_buffers()
+        fbo = self._fbos[self._back]
+        draw_fbo = self._msaa_fbo if self._msaa_fbo is not None else fbo
+        draw_fbo.bind()
+        glViewport(0, 0, draw_fbo.width(), draw_fbo.height())
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.model.Update()
+        self.model.Draw()
+        draw_fbo.release()
+        if self._msaa_fbo is not None:
+            QOpenGLFramebufferObject.blitFramebuffer(fbo, self._msaa_fbo)
+        # 确保这一帧在 GUI 上下文采样之前已经画完
+        glFinish()
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            self._has_new = True
+            self._has_frame = True
+        self.frame_ready.emit(time.perf_counter())
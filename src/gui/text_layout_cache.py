@@ -0,0 +1,111 @@
+"""
+聊天气泡的文字排版缓存
+
+气泡尺寸按 (文本哈希, 字体, 可用宽度档位) 缓存。可用宽度按 bucket_px 向下取整分档，
+文字在档位宽度处换行，因此同一档位内改变窗口宽度不需要重新排版；
+自然宽度（最长一行的宽度）放得下的文本与可用宽度无关，只排版一次。
+窗口缩放时只有档位发生变化、且需要换行的长文本才会重新测量。
+
+estimate_height 不做任何测量，只按字符数粗估高度，供尚未实体化、也从未测量过的行占位。
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from PySide6.QtCore import QRect, QSize, Qt
+from PySide6.QtGui import QFont, QFontMetrics
+
+# 按字符换行，与绘制时使用的 QTextOption.WrapAnywhere 一致
+WRAP_FLAGS = Qt.TextFlag.TextWrapAnywhere | Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop
+
+# 自然宽度放得下时使用的档位，与可用宽度无关
+FIT_BUCKET = -1
+
+
+class TextLayoutCache:
+    """
+    测量并缓存文本气泡的尺寸（含内边距）。条目数超过 max_entries 时按最近最少使用淘汰。
+    """
+
+    def __init__(self, font: QFont, padding: int = 10, min_width: int = 50, bucket_px: int = 16, max_entries: int = 50000):
+        self.padding = padding
+        self.min_width = min_width
+        self.bucket_px = max(1, bucket_px)
+        self.max_entries = max_entries
+        self._sizes: "OrderedDict[Tuple[int, int, str, int], QSize]" = OrderedDict()
+        self._natural: "OrderedDict[Tuple[int, int, str], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.set_font(font)
+
+    def set_font(self, font: QFont) -> None:
+        # 字体是键的一部分，换字体后旧条目自然不再命中，随 LRU 淘汰
+        self.font = QFont(font)
+        self.font_key = self.font.key()
+        self.metrics = QFontMetrics(self.font)
+        self.narrow_char_width = max(self.metrics.averageCharWidth(), 1)
+        self.wide_char_width = max(self.metrics.horizontalAdvance("\u4e2d"), 1)
+
+    def bucket(self, max_width: int) -> int:
+        return max_width // self.bucket_px
+
+    def natural_width(self, text: str) -> int:
+        key = (hash(text), len(text), self.font_key)
+        width = self._natural.get(key)
+        if width is None:
+            width = max((self.metrics.horizontalAdvance(line) for line in text.split("\n")), default=0)
+            self._natural[key] = width
+            if len(self._natural) > self.max_entries:
+                self._natural.popitem(last=False)
+        return width
+
+    def bubble_size(self, text: str, max_width: int) -> QSize:
+        """
+        :param max_width: 气泡允许的最大宽度（含内边距）
+        """
+        content_width = self.natural_width(text) + 2 * self.padding + 2
+        if content_width <= max_width:
+            bucket = FIT_BUCKET
+            width = max(content_width, self.min_width)
+        else:
+            bucket = self.bucket(max_width)
+            width = max(bucket * self.bucket_px, self.min_width)
+        key = (hash(text), len(text), self.font_key, bucket)
+        size = self._sizes.get(key)
+        if size is not None:
+            self._sizes.move_to_end(key)
+            self.hits += 1
+            return size
+        self.misses += 1
+        text_rect = self.metrics.boundingRect(QRect(0, 0, width - 2 * self.padding, 1 << 20), WRAP_FLAGS, text)
+        size = QSize(width, text_rect.height() + 2 * self.padding)
+        self._sizes[key] = size
+        if len(self._sizes) > self.max_entries:
+            self._sizes.popitem(last=False)
+        return size
+
+    def estimate_height(self, text: str, max_width: int) -> int:
+        """
+        按字符数估算气泡高度（含内边距），不排版也不写缓存。
+        中日韩等宽字符按一个汉字宽计，其余字符按平均字符宽度计。
+        :param max_width: 气泡允许的最大宽度（含内边距）
+        """
+        content_width = max(max_width - 2 * self.padding - 2, 1)
+        lines = 0
+        for line in text.split("\n"):
+            wide = sum(1 for ch in line if ch >= "\u2e80")
+            width = wide * self.wide_char_width + (len(line) - wide) * self.narrow_char_width
+            lines += max(1, -(-width // content_width))
+        return self.metrics.height() + (lines - 1) * self.metrics.lineSpacing() + 2 * self.padding
+
+    def clear(self) -> None:
+        self._sizes.clear()
+        self._natural.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._sizes),
+            "natural_entries": len(self._natural),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,212 @@
+"""
+聊天图片缩略图加载
+
+图片在 QThreadPool 中解码，QImageReader.setScaledSize 让解码器直接输出缩略图尺寸，
+不再在 GUI 线程解码整张原图再缩放。解码结果以 PNG 写入磁盘缓存，键由文件路径、大小、
+修改时间和目标尺寸的哈希组成，原图被修改后自然失效；再次打开同一页历史时直接读取
+几十 KB 的缩略图。磁盘缓存有容量上限，按最近使用时间 (LRU) 淘汰；
+内存中按最近最少使用保留已转换好的 QPixmap。
+"""
+
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QSize, QThreadPool, Signal
+from PySide6.QtGui import QImage, QImageReader, QPixmap
+
+from ..utils.helpers import calculate_hash
+from ..utils.logger import get_logger
+
+logger = get_logger("thumbnail_loader")
+
+ThumbKey = Tuple[str, int, int]  # (路径, 宽, 高)
+
+CACHE_SUFFIX = ".png"
+
+
+def thumbnail_cache_path(cache_dir: str, path: str, size: QSize) -> Optional[str]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = calculate_hash(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{size.width()}x{size.height()}", algorithm="sha1")
+    return os.path.join(cache_dir, key + CACHE_SUFFIX)
+
+
+class ThumbnailSignals(QObject):
+    """
+    缩略图任务的完成通知。由 ThumbnailLoader 持有并留在 GUI 线程，
+    任务本身是普通的 QRunnable，run() 返回后由线程池删除，不会在仍在运行时被释放
+    """
+    # 路径, 宽, 高, 缩略图, 读取或写入的磁盘缓存文件（没有时为空串）
+    decoded = Signal(str, int, int, QImage, str)
+
+
+class ThumbnailTask(QRunnable):
+    """
+    在线程池中生成一张缩略图：先查磁盘缓存，未命中时按目标尺寸解码原图并写入缓存
+    """
+
+    def __init__(self, path: str, size: QSize, cache_dir: Optional[str], signals: ThumbnailSignals):
+        super().__init__()
+        self.path = path
+        self.size = size
+        self.cache_dir = cache_dir
+        self.signals = signals
+        self.cache_path: Optional[str] = None
+
+    def run(self):
+        image = QImage()
+        cached = False
+        if self.cache_dir:
+            self.cache_path = thumbnail_cache_path(self.cache_dir, self.path, self.size)
+        if self.cache_path and os.path.exists(self.cache_path):
+            image = QImage(self.cache_path)
+            cached = not image.isNull()
+        if image.isNull():
+            image = self.decode()
+            if not image.isNull() and self.cache_path:
+                cached = self.save(image)
+        self.signals.decoded.emit(self.path, self.size.width(), self.size.height(), image,
+                                  self.cache_path if cached else "")
+
+    def decode(self) -> QImage:
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        reader.setScaledSize(self.size)
+        image = reader.read()
+        if image.isNull():
+            logger.warning(f"Failed to decode image {self.path}: {reader.errorString()}")
+        return image
+
+    def save(self, image: QImage) -> bool:
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            if image.save(tmp_path, "PNG"):
+                os.replace(tmp_path, self.cache_path)
+                return True
+        except OSError as e:
+            logger.warning(f"Failed to cache thumbnail of {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return False
+
+
+class ThumbnailLoader(QObject):
+    """
+    缩略图的异步加载与缓存。request() 命中内存缓存时直接返回 QPixmap，
+    否则提交后台任务并返回 None，完成后发出 thumbnail_ready(path)。
+
+    磁盘缓存的索引只在 GUI 线程中维护：任务完成时登记用到的缓存文件，
+    总大小超过 max_disk_mb 时删除最久未用的文件。
+    """
+    thumbnail_ready = Signal(str)
+
+    def __init__(self, cache_dir: Optional[str] = "temp/thumbnails", max_entries: int = 200, max_disk_mb: float = 100,
+                 pool: Optional[QThreadPool] = None, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_size = int(max_disk_mb * 1024 * 1024)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._pixmaps: "OrderedDict[ThumbKey, QPixmap]" = OrderedDict()
+        self._failed: set = set()
+        self._pending: set = set()
+        self._signals = ThumbnailSignals(self)
+        self._signals.decoded.connect(self._on_decoded)
+        # 缓存文件名 -> 文件大小，顺序即 LRU 顺序（末尾为最近使用）
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk_cache()
+
+    def request(self, path: str, size: QSize) -> Optional[QPixmap]:
+        """
+        :param size: 缩略图的像素尺寸（已乘以设备像素比）
+        :return: 已就绪的缩略图；仍在加载或加载失败时返回 None，可用 is_failed 区分
+        """
+        key = (path, size.width(), size.height())
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        if key in self._failed or key in self._pending:
+            return None
+        self._pending.add(key)
+        # 线程池接管任务，run() 返回后自动删除
+        self.pool.start(ThumbnailTask(path, size, self.cache_dir, self._signals))
+        return None
+
+    def is_failed(self, path: str, size: QSize) -> bool:
+        return (path, size.width(), size.height()) in self._failed
+
+    def _on_decoded(self, path: str, width: int, height: int, image: QImage, cache_path: str) -> None:
+        key = (path, width, height)
+        self._pending.discard(key)
+        if cache_path:
+            self._touch_disk_entry(cache_path)
+        if image.isNull():
+            self._failed.add(key)
+        else:
+            # QPixmap 只能在 GUI 线程创建
+            self._pixmaps[key] = QPixmap.fromImage(image)
+            if len(self._pixmaps) > self.max_entries:
+                self._pixmaps.popitem(last=False)
+        self.thumbnail_ready.emit(path)
+
+    # ---- 磁盘缓存 ----
+
+    def _scan_disk_cache(self) -> None:
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk_index[name] = size
+            self._disk_size += size
+        self._evict_disk_cache()
+
+    def _touch_disk_entry(self, cache_path: str) -> None:
+        name = os.path.basename(cache_path)
+        try:
+            size = os.path.getsize(cache_path)
+        except OSError:
+            return
+        self._disk_size += size - self._disk_index.pop(name, 0)
+        self._disk_index[name] = size
+        self._evict_disk_cache()
+
+    def _evict_disk_cache(self) -> None:
+        while self._disk_size > self.max_disk_size and len(self._disk_index) > 1:
+            name, size = self._disk_index.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict cached thumbnail {name}: {e}")
+
+    def disk_cache_size(self) -> int:
+        return self._disk_size
+
+    def retain(self, keys) -> None:
+        """
+        只保留 keys 中的缩略图，其余从内存中释放；磁盘缓存不受影响，再次需要时很快就能读回
+        """
+        for key in [key for key in self._pixmaps if key not in keys]:
+            del self._pixmaps[key]
+
+    def pixmap_count(self) -> int:
+        return len(self._pixmaps)
+
+    def clear(self) -> None:
+        self._pixmaps.clear()
+        self._failed.clear()
@@ -0,0 +1,106 @@
+"""
+导入耗时统计
+
+使用 --import-profile 启动时统计每个模块的导入耗时并写出排序后的报告。
+本模块只依赖标准库，main.py 在导入 PySide6 等任何其他模块之前安装它，报告才能覆盖整个进程。
+"""
+
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class _TimedLoader:
+    """
+    包装真实的 loader，只对 exec_module 计时，其余属性全部转发；
+    模块执行完后把 __loader__ / __spec__.loader 还原成原来的 loader
+    """
+
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        spec = getattr(module, "__spec__", None)
+        if spec is not None:
+            spec.loader = self._loader
+        module.__loader__ = self._loader
+        with self._profiler.measure(module.__name__):
+            self._loader.exec_module(module)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    导入耗时统计，相当于内置的 python -X importtime（打包后的程序也能用）。
+    self 为模块自身执行的时间，cumulative 包含它导入的子模块。
+    """
+
+    def __init__(self, report_path: str = "temp/import_profile.txt"):
+        self.report_path = report_path
+        self.records: Dict[str, List[float]] = {}  # name -> [self_ms, cumulative_ms]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self) -> "ImportProfiler":
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0]  # 子模块累计耗时
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                self.records[name] = [elapsed - frame[0], elapsed]
+
+    def report(self, limit: int = 200) -> str:
+        with self._lock:
+            rows = sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)
+        total = sum(self_ms for self_ms, _ in self.records.values())
+        lines = [f"Import profile: {len(rows)} modules, {total:.1f} ms self time total", f"{'self ms':>10}  {'cumulative ms':>14}  module"]
+        for name, (self_ms, cumulative_ms) in rows[:limit]:
+            lines.append(f"{self_ms:10.1f}  {cumulative_ms:14.1f}  {name}")
+        return "\n".join(lines)
+
+    def write_report(self) -> str:
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(self.report() + "\n")
+        return self.report_path
@@ -0,0 +1,169 @@
+"""
+Live2D 参数动画混合器
+
+把表情、口型、覆盖和拖拽等来源组织成有权重的动画层，每帧用 NumPy 对全部参数做
+一次向量化混合，结果以 (下标, 值, 权重) 的形式通过一次批量调用写入模型。
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _linear(t: float) -> float:
+    return t
+
+
+def _smoothstep(t: float) -> float:
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _ease_out(t: float) -> float:
+    return 1.0 - (1.0 - t) * (1.0 - t)
+
+
+BLEND_CURVES = {
+    "linear": _linear,
+    "smoothstep": _smoothstep,
+    "ease_out": _ease_out,
+}
+
+
+class AnimationLayer:
+    """
+    一个动画层：对部分参数给出目标值。
+
+    - values/targets: 参数值，values 以 smoothing 为时间常数追随 targets（0 表示立即到达）
+    - mask: 每个参数参与该层的程度 [0, 1]
+    - weight: 整层权重，fade_to 时按混合曲线在 blend_time 内过渡
+    """
+
+    def __init__(self, name: str, size: int, blend_time: float = 0.2, curve: str = "smoothstep", smoothing: float = 0.0):
+        self.name = name
+        self.values = np.zeros(size, dtype=np.float32)
+        self.targets = np.zeros(size, dtype=np.float32)
+        self.mask = np.zeros(size, dtype=np.float32)
+        self.blend_time = blend_time
+        self.curve = BLEND_CURVES.get(curve, _smoothstep)
+        self.smoothing = smoothing
+        self.weight: float = 0.0
+        self._fade_from: float = 0.0
+        self._fade_to: float = 0.0
+        self._fade_time: float = 0.0
+        self._fade_elapsed: float = 0.0
+
+    def set_targets(self, indices: Sequence[int], values: Sequence[float], mask: float = 1.0, snap: bool = False) -> None:
+        indices = np.asarray(indices, dtype=np.intp)
+        self.targets[indices] = values
+        self.mask[indices] = mask
+        if snap:
+            self.values[indices] = self.targets[indices]
+
+    def clear(self, indices: Optional[Sequence[int]] = None) -> None:
+        if indices is None:
+            self.mask[:] = 0.0
+        else:
+            self.mask[np.asarray(indices, dtype=np.intp)] = 0.0
+
+    def fade_to(self, weight: float, blend_time: Optional[float] = None) -> None:
+        if weight == self._fade_to and self._fade_elapsed < self._fade_time:
+            return
+        self._fade_from = self.weight
+        self._fade_to = weight
+        self._fade_time = self.blend_time if blend_time is None else blend_time
+        self._fade_elapsed = 0.0
+        if self._fade_time <= 0:
+            self.weight = weight
+
+    def is_settled(self, tolerance: float = 1e-3) -> bool:
+        """
+        权重已到达目标，且（层生效时）数值已追上目标
+        """
+        if self.weight != self._fade_to:
+            return False
+        if self.weight <= 0.0 or self.smoothing <= 0:
+            return True
+        return float(np.max(np.abs(self.targets - self.values) * self.mask, initial=0.0)) < tolerance
+
+    def advance(self, dt: float) -> None:
+        if self.weight != self._fade_to:
+            self._fade_elapsed += dt
+            t = min(self._fade_elapsed / self._fade_time, 1.0) if self._fade_time > 0 else 1.0
+            self.weight = self._fade_from + (self._fade_to - self._fade_from) * self.curve(t)
+        if self.smoothing > 0:
+            alpha = 1.0 - math.exp(-dt / self.smoothing)
+            self.values += (self.targets - self.values) * alpha
+        else:
+            self.values[:] = self.targets
+
+
+class AnimationMixer:
+    """
+    按顺序叠加动画层，后面的层覆盖前面的层。
+
+    设原生 Update 之后参数值为 base，某层的有效权重为 w、值为 x，叠加一层即
+    base' = base * (1 - w) + x * w。逐层展开后最终值可写成 base * (1 - W) + V * W，
+    因此不需要读取 base，直接把 (V, W) 交给 SetIndexParamValue(index, V, W) 即可。
+    """
+
+    LAYER_ORDER = ("expression", "lip_sync", "override", "drag")
+
+    def __init__(self, param_ids: List[str]):
+        self.param_ids = param_ids
+        self.param_index: Dict[str, int] = {param_id: index for index, param_id in enumerate(param_ids)}
+        size = len(param_ids)
+        self.layers: Dict[str, AnimationLayer] = {
+            "expression": AnimationLayer("expression", size, blend_time=0.3, smoothing=0.15),
+            "lip_sync": AnimationLayer("lip_sync", size, blend_time=0.12, curve="ease_out", smoothing=0.03),
+            "override": AnimationLayer("override", size, blend_time=0.2),
+            "drag": AnimationLayer("drag", size, blend_time=0.4, smoothing=0.12),
+        }
+        self._premultiplied = np.zeros(size, dtype=np.float32)
+        self._remaining = np.ones(size, dtype=np.float32)
+
+    def layer(self, name: str) -> AnimationLayer:
+        return self.layers[name]
+
+    def indices_of(self, param_ids: Sequence[str]) -> Tuple[List[int], List[int]]:
+        """
+        参数名 -> 下标；返回 (下标列表, 在 param_ids 中的位置列表)，模型中不存在的参数被跳过
+        """
+        indices, positions = [], []
+        for position, param_id in enumerate(param_ids):
+            index = self.param_index.get(param_id)
+            if index is not None:
+                indices.append(index)
+                positions.append(position)
+        return indices, positions
+
+    def is_blending(self) -> bool:
+        return not all(layer.is_settled() for layer in self.layers.values())
+
+    def is_active(self, name: str) -> bool:
+        return self.layers[name].weight > 0.0
+
+    def evaluate(self, dt: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        推进所有层并计算本帧结果
+        :return: (indices, values, weights)，只包含本帧有层参与的参数
+        """
+        premultiplied = self._premultiplied
+        remaining = self._remaining
+        premultiplied.fill(0.0)
+        remaining.fill(1.0)
+        for name in self.LAYER_ORDER:
+            layer = self.layers[name]
+            layer.advance(dt)
+            if layer.weight <= 0.0:
+                continue
+            w = layer.mask * layer.weight
+            premultiplied *= 1.0 - w
+            premultiplied += layer.values * w
+            remaining *= 1.0 - w
+
+        total = 1.0 - remaining
+        indices = np.flatnonzero(total > 1e-4)
+        weights = total[indices]
+        values = premultiplied[indices] / weights
+        return indices, values, weights
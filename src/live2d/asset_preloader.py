@@ -0,0 +1,119 @@
+"""
+Live2D 模型资源预加载
+
+在登录等待期间于后台线程解析 live2d_interface_config.json 和 model3.json，
+并预读模型引用的全部文件（moc3、纹理、物理、表情、动作），让随后 GL 线程中的
+LoadModelJson 直接命中系统文件缓存。各阶段耗时写入日志。
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..utils.logger import get_logger
+
+_preloaders: Dict[str, "AssetPreloader"] = {}
+_preloaders_lock = threading.Lock()
+
+
+class AssetPreloader:
+    """后台预加载一个模型的配置和资源文件"""
+
+    READ_CHUNK = 1 << 20
+
+    def __init__(self, live2d_config: Dict[str, Any]):
+        self.model_config: Dict[str, Any] = live2d_config["model"]
+        self.model_path: str = self.model_config["model_path"]
+        self.interface_config_path: str = self.model_config.get("interface_config_path", "config/live2d_interface_config.json")
+        self.logger = get_logger(self.__class__.__name__)
+        self.interface_config: Optional[Dict[str, Any]] = None
+        self.model_json: Optional[Dict[str, Any]] = None
+        self.timings: Dict[str, float] = {}
+        self.warmed_bytes: int = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live2d-preload", daemon=True)
+
+    def start(self) -> "AssetPreloader":
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _stage(self, name: str, start: float) -> float:
+        now = time.perf_counter()
+        self.timings[name] = (now - start) * 1000
+        return now
+
+    def _run(self) -> None:
+        start = t = time.perf_counter()
+        try:
+            with open(self.interface_config_path, "r", encoding="utf-8") as f:
+                self.interface_config = json.load(f)
+            t = self._stage("interface_config", t)
+
+            with open(self.model_path, "r", encoding="utf-8") as f:
+                self.model_json = json.load(f)
+            t = self._stage("model_json", t)
+
+            for path in self.referenced_files():
+                self.warmed_bytes += self._warm(path)
+            t = self._stage("warm_files", t)
+        except Exception as e:
+            self.logger.warning(f"Live2D 资源预加载失败: {e}")
+        finally:
+            self.timings["total"] = (time.perf_counter() - start) * 1000
+            stages = ", ".join(f"{name}={ms:.1f}ms" for name, ms in self.timings.items())
+            self.logger.info(f"Live2D preload {os.path.basename(self.model_path)}: {stages}, {self.warmed_bytes / 1024:.0f} KiB")
+            self._done.set()
+
+    def referenced_files(self) -> List[str]:
+        """
+        model3.json 中引用的全部文件的路径
+        """
+        refs = (self.model_json or {}).get("FileReferences", {})
+        model_dir = os.path.dirname(self.model_path)
+        files: List[str] = []
+        for key in ("Moc", "Physics", "Pose", "UserData", "DisplayInfo"):
+            if refs.get(key):
+                files.append(refs[key])
+        files.extend(refs.get("Textures", []))
+        files.extend(item["File"] for item in refs.get("Expressions", []) if "File" in item)
+        for motions in refs.get("Motions", {}).values():
+            files.extend(item["File"] for item in motions if "File" in item)
+        return [os.path.join(model_dir, name) for name in files]
+
+    def _warm(self, path: str) -> int:
+        """
+        顺序读完整个文件，只为让它进入系统文件缓存
+        """
+        size = 0
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while True:
+                    chunk = f.read(self.READ_CHUNK)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+        except OSError as e:
+            self.logger.warning(f"预读文件失败 {path}: {e}")
+        return size
+
+
+def preload_model_assets(live2d_config: Dict[str, Any]) -> AssetPreloader:
+    """
+    为指定模型启动后台预加载；同一模型只会启动一次
+    """
+    model_path = live2d_config["model"]["model_path"]
+    with _preloaders_lock:
+        preloader = _preloaders.get(model_path)
+        if preloader is None:
+            preloader = _preloaders[model_path] = AssetPreloader(live2d_config).start()
+    return preloader
+
+
+def get_preloader(model_path: str) -> Optional[AssetPreloader]:
+    with _preloaders_lock:
+        return _preloaders.get(model_path)
@@ -1,30 +1,87 @@
 import live2d.v3 as live2d
-from typing import Optional, List, Dict, Any
+import time
+import numpy as np
+from collections import deque
+from typing import Optional, List, Dict, Any, Deque, Tuple
+from .animation_mixer import AnimationMixer
+from .asset_preloader import get_preloader
 from ..utils.logger import get_logger
 
 class Live2dModel():
+    """
+    LAppModel 的封装。
+
+    原生模型只允许在渲染线程中修改：其他线程通过 post_* 方法把带时间戳的命令放入
+    无锁队列（deque 的 append/popleft 是原子操作），渲染循环在每帧 Update 之后、
+    Draw 之前一次性取出并应用。口型以整段包络的形式提交，由渲染循环按当前时间采样。
+
+    表情的基础嘴型、口型同步、参数覆盖和拖拽视线分别放在 AnimationMixer 的不同层里，
+    每帧混合一次后批量写入，不再出现多处写同一参数、谁最后写谁生效的情况。
+    """
+    MOUTH_PARAM = "ParamMouthOpenY"
+    TAP_AREA = "头"  # 点击该区域切换表情
+    # 拖拽层控制的参数及其在归一化坐标 (x, y) 下的系数: value = x * kx + y * ky + x * y * kxy
+    DRAG_PARAMS: Dict[str, Tuple[float, float, float]] = {
+        "ParamAngleX": (30.0, 0.0, 0.0),
+        "ParamAngleY": (0.0, 30.0, 0.0),
+        "ParamAngleZ": (0.0, 0.0, -30.0),
+        "ParamBodyAngleX": (10.0, 0.0, 0.0),
+        "ParamEyeBallX": (1.0, 0.0, 0.0),
+        "ParamEyeBallY": (0.0, 1.0, 0.0),
+    }
+
     def __init__(self, live2d_config: Dict[str, Any]) -> None:
         self.config = live2d_config
         self.logger = get_logger(self.__class__.__name__)
         self.model_config: Dict[str, Any] = self.config["model"]
         interface_config_path = self.model_config.get("interface_config_path", "config/live2d_interface_config.json")
-        with open(interface_config_path, "r", encoding="utf-8") as f:
-            import json
-            self.interface_config: Dict[str, Any] = json.load(f)
+        # 优先使用后台预加载（见 asset_preloader）已经解析好的配置
+        preloader = get_preloader(self.model_config["model_path"])
+        if preloader is not None and not preloader.wait(timeout=5):
+            self.logger.warning("Live2D 资源预加载超时，改为同步加载")
+            preloader = None
+        self._model_json: Optional[Dict[str, Any]] = preloader.model_json if preloader else None
+        if preloader is not None and preloader.interface_config is not None and preloader.interface_config_path == interface_config_path:
+            self.interface_config: Dict[str, Any] = preloader.interface_config
+        else:
+            with open(interface_config_path, "r", encoding="utf-8") as f:
+                import json
+                self.interface_config: Dict[str, Any] = json.load(f)
         self.expression_projection: Dict[str, str] = self.interface_config.get("expression_projection", {})
         self.mouth_value_projection: Dict[str, float] = self.interface_config.get("mouth_value_projection", {})
+        # 表情命令 -> 表情ID；表情ID本身也可以作为命令
+        self.cmd_to_expression: Dict[str, str] = {expression: expression for expression in self.expression_projection.values()}
+        self.cmd_to_expression.update(self.expression_projection)
+        self.model: Optional[live2d.LAppModel] = None
+        self.param_ids: List[str] = []
+        self.param_index: Dict[str, int] = {}
+
+        # 跨线程命令队列: (timestamp, kind, args)
+        self._commands: Deque[Tuple[float, str, tuple]] = deque()
+        # 以下状态只在渲染线程中读写
+        self.mixer: Optional[AnimationMixer] = None
+        self._mouth_tracks: Deque[list] = deque()  # 待播放的口型包络片段 [start_time, fps, amps]
+        self._last_frame: Optional[float] = None
+        self._view_size: Tuple[int, int] = (1, 1)
 
     
     def model_init(self) -> None:
         assert live2d.LIVE2D_VERSION == 3, "仅支持 live2d v3"
+        start = time.perf_counter()
         live2d.glInit()
         self.model_path: str = self.model_config["model_path"]
         self.model: Optional[live2d.LAppModel] = live2d.LAppModel()
         self.model.LoadModelJson(self.model_path)
+        loaded = time.perf_counter()
+        self._init_parameters()
         self._init_expression()
         self._init_motion()
         self._init_hit_areas()
         self.offset = self.model_config.get("offset", [0, 0])
+        self.logger.info(
+            f"Live2D model_init: load_model_json={(loaded - start) * 1000:.1f}ms, "
+            f"init={(time.perf_counter() - loaded) * 1000:.1f}ms"
+        )
 
         # 自动眨眼和呼吸
         self.model.SetAutoBlinkEnable(True)
@@ -32,6 +89,16 @@ class Live2dModel():
         self.model.SetOffset(self.offset[0], self.offset[1])
 
     # Belows are init functions
+    def _init_parameters(self) -> None:
+        # 参数名 -> 下标，只在加载模型时构建一次
+        self.param_ids = list(self.model.GetParamIds())
+        self.param_index = {param_id: index for index, param_id in enumerate(self.param_ids)}
+        self.mouth_param_index: int = self.param_index.get(self.MOUTH_PARAM, -1)
+        self.mixer = AnimationMixer(self.param_ids)
+        self._drag_indices, positions = self.mixer.indices_of(list(self.DRAG_PARAMS))
+        coefficients = list(self.DRAG_PARAMS.values())
+        self._drag_coefficients = np.array([coefficients[i] for i in positions], dtype=np.float32).reshape(-1, 3)
+
     def _init_expression(self) -> None:
         # 处理表情数据
         self.expression_list: List[str] = self.model.GetExpressionIds()
@@ -43,18 +110,22 @@ class Live2dModel():
             self.default_expression_index: int = 0
         self.now_expression: int = self.default_expression_index
         self.expression_num: int = len(self.expression_list)
-        self.model.SetExpression(self.expression_list[self.now_expression])
+        # 只保留映射到模型中真实存在的表情的命令
+        self.cmd_to_expression = {cmd: expression for cmd, expression in self.cmd_to_expression.items() if expression in self.expression_list}
+        self.SetExpression(self.expression_list[self.now_expression])
     
     def _init_motion(self) -> None:
         # 处理动作数据
         self.motion_group_names: List[str] = [group_name for group_name in self.model.GetMotionGroups().keys()]
     
     def _init_hit_areas(self) -> None:
-        model_json_path: str = self.model_config["model_path"]
-        with open(model_json_path, "r", encoding="utf-8") as f:
-            import json
-            model_json: Dict[str, Any] = json.load(f)
-            self.hit_areas: List[Dict[str, str]] = model_json.get("HitAreas", [])
+        model_json = self._model_json
+        if model_json is None:
+            model_json_path: str = self.model_config["model_path"]
+            with open(model_json_path, "r", encoding="utf-8") as f:
+                import json
+                model_json = json.load(f)
+        self.hit_areas: List[Dict[str, str]] = model_json.get("HitAreas", [])
     
     # Belows are custom methods
     def set_next_expression(self) -> None:
@@ -67,20 +138,194 @@ class Live2dModel():
     def Update(self) -> None:
         if self.model:
             self.model.Update()
+            self.apply_commands()
+
+    # Belows are thread-safe producer methods, consumed by the render loop
+    def post_parameter(self, paramId: str, value: float, weight: float = 1.0) -> None:
+        self._commands.append((time.perf_counter(), "param", (paramId, value, weight)))
+
+    def post_expression(self, cmd_name: str) -> None:
+        self._commands.append((time.perf_counter(), "expression", (cmd_name,)))
+
+    def post_mouth_track(self, amps, fps: int = 60) -> None:
+        """
+        提交一段口型包络，紧接在之前提交的片段之后播放
+        :param amps: 每帧的口型参数值
+        :param fps: 包络的帧率
+        """
+        self._commands.append((time.perf_counter(), "mouth_track", (amps, fps)))
+
+    def post_mouth_reset(self) -> None:
+        """
+        丢弃尚未播放的口型包络，口型层淡出，嘴型回到当前表情的基础值
+        """
+        self._commands.append((time.perf_counter(), "mouth_reset", ()))
+
+    def post_override(self, paramId: str, value: float, weight: float = 1.0) -> None:
+        """
+        在覆盖层中持续保持某个参数（例如盖过自动眨眼、呼吸），直到 post_release
+        """
+        self._commands.append((time.perf_counter(), "override", (paramId, value, weight)))
+
+    def post_release(self, paramId: Optional[str] = None) -> None:
+        """
+        取消覆盖层中的参数，None 表示全部
+        """
+        self._commands.append((time.perf_counter(), "release", (paramId,)))
+
+    def post_drag(self, x: float, y: float) -> None:
+        self._commands.append((time.perf_counter(), "drag", (x, y)))
+
+    def post_drag_release(self) -> None:
+        self._commands.append((time.perf_counter(), "drag_release", ()))
+
+    def post_tap(self, x: float, y: float) -> None:
+        """
+        点击命中 TAP_AREA 时切换到下一个表情；命中检测在渲染线程中进行
+        """
+        self._commands.append((time.perf_counter(), "tap", (x, y)))
+
+    def apply_commands(self, now: Optional[float] = None) -> None:
+        """
+        渲染线程调用：按提交顺序应用本帧之前收到的全部命令，按当前时间采样口型，
+        然后由混合器一次算出所有层的结果并批量写入
+        """
+        now = time.perf_counter() if now is None else now
+        dt = 0.0 if self._last_frame is None else min(max(now - self._last_frame, 0.0), 0.1)
+        self._last_frame = now
+        params: Dict[str, Tuple[float, float]] = {}
+        while True:
+            try:
+                timestamp, kind, args = self._commands.popleft()
+            except IndexError:
+                break
+            if kind == "param":
+                # 同一帧内对同一参数的多次写入只保留最后一次
+                paramId, value, weight = args
+                params[paramId] = (value, weight)
+            elif kind == "expression":
+                self.set_expression_by_cmd(args[0])
+            elif kind == "mouth_track":
+                amps, fps = args
+                self._mouth_tracks.append([max(timestamp, self._mouth_tracks_end()), fps, amps])
+            elif kind == "mouth_reset":
+                self._mouth_tracks.clear()
+            elif kind == "override":
+                self._set_override(*args)
+            elif kind == "release":
+                self._release_override(args[0])
+            elif kind == "drag":
+                self._set_drag(*args)
+            elif kind == "drag_release" and self.mixer:
+                self.mixer.layer("drag").fade_to(0.0)
+            elif kind == "tap":
+                if self.HitTest(self.TAP_AREA, *args):
+                    self.set_next_expression()
+
+        if self.mixer:
+            lip_sync = self.mixer.layer("lip_sync")
+            mouth = self._sample_mouth(now)
+            if mouth is not None and self.mouth_param_index >= 0:
+                lip_sync.set_targets([self.mouth_param_index], [mouth])
+                lip_sync.fade_to(1.0)
+            elif not self._mouth_tracks:
+                lip_sync.fade_to(0.0)
+            indices, values, weights = self.mixer.evaluate(dt)
+            if len(indices):
+                self.set_parameters(indices, values, weights)
+
+        indices, values, weights = [], [], []
+        for paramId, (value, weight) in params.items():
+            index = self.param_index.get(paramId)
+            if index is None:
+                self.SetParameterValue(paramId, value, weight)
+            else:
+                indices.append(index)
+                values.append(value)
+                weights.append(weight)
+        if indices:
+            self.set_parameters(indices, values, weights)
+
+    def is_animating(self) -> bool:
+        """
+        是否有需要高帧率渲染的变化：待处理的命令、正在播放的口型，或仍在过渡中的混合层
+        （拖拽视线在指针停下后会自然收敛，之后不再算作活动）
+        """
+        if self._commands or self._mouth_tracks:
+            return True
+        if self.mixer is None:
+            return False
+        return self.mixer.is_blending() or self.mixer.is_active("lip_sync")
+
+    def _set_override(self, paramId: str, value: float, weight: float) -> None:
+        index = self.param_index.get(paramId)
+        if self.mixer and index is not None:
+            override = self.mixer.layer("override")
+            override.set_targets([index], [value], mask=weight)
+            override.fade_to(1.0)
+
+    def _release_override(self, paramId: Optional[str]) -> None:
+        if not self.mixer:
+            return
+        override = self.mixer.layer("override")
+        if paramId is None:
+            override.fade_to(0.0)
+            return
+        index = self.param_index.get(paramId)
+        if index is not None:
+            override.clear([index])
+
+    def _set_drag(self, x: float, y: float) -> None:
+        """
+        把窗口坐标归一化到 [-1, 1] 后换算为头部、身体和眼球角度
+        """
+        if not self.mixer or not self._drag_indices:
+            return
+        w, h = self._view_size
+        nx = min(max(x / w * 2.0 - 1.0, -1.0), 1.0)
+        ny = min(max(1.0 - y / h * 2.0, -1.0), 1.0)
+        values = self._drag_coefficients @ np.array([nx, ny, nx * ny], dtype=np.float32)
+        drag = self.mixer.layer("drag")
+        drag.set_targets(self._drag_indices, values)
+        drag.fade_to(1.0)
+
+    def _mouth_tracks_end(self) -> float:
+        if not self._mouth_tracks:
+            return 0.0
+        start, fps, amps = self._mouth_tracks[-1]
+        return start + len(amps) / fps
+
+    def _sample_mouth(self, now: float) -> Optional[float]:
+        while self._mouth_tracks:
+            start, fps, amps = self._mouth_tracks[0]
+            if now < start:
+                return None
+            index = int((now - start) * fps)
+            if index < len(amps):
+                return float(amps[index])
+            self._mouth_tracks.popleft()
+        return None
 
     def Draw(self) -> None:
         if self.model:
             self.model.Draw()
 
     def Resize(self, w: int, h: int) -> None:
+        self._view_size = (max(w, 1), max(h, 1))
         if self.model:
             self.model.Resize(w, h)
 
     def SetExpression(self, expression_id: str) -> None:
         if self.model:
             self.model.SetExpression(expression_id)
+            # 表情的基础嘴型放在混合器的表情层，口型同步层叠加在其上
             mouth_value = self.mouth_value_projection.get(expression_id, -1)
-            self.SetMouthOpenValue(mouth_value, weight=1.0)  # 单独设置口型参数
+            if self.mixer and self.mouth_param_index >= 0:
+                expression = self.mixer.layer("expression")
+                expression.set_targets([self.mouth_param_index], [mouth_value], snap=expression.weight == 0.0)
+                expression.fade_to(1.0)
+            else:
+                self.SetMouthOpenValue(mouth_value, weight=1.0)
 
     def HitTest(self, area_name: str, x: float, y: float) -> bool:
         if self.model:
@@ -89,7 +334,7 @@ class Live2dModel():
     
     def Drag(self, x: float, y: float) -> None:
         if self.model:
-            self.model.Drag(x, y)
+            self.post_drag(x, y)
 
     def SetAutoBlinkEnable(self, enable: bool) -> None:
         if self.model:
@@ -136,19 +381,41 @@ class Live2dModel():
 
     def SetParameterValue(self, paramId: str, value: float, weight: float = 1.0) -> None:
         if self.model:
-            self.model.SetParameterValue(paramId, value, weight)
+            index = self.param_index.get(paramId)
+            if index is None:
+                self.model.SetParameterValue(paramId, value, weight)
+            else:
+                self.model.SetIndexParamValue(index, value, weight)
+
+    def set_parameters(self, indices, values, weights=None) -> None:
+        """
+        按下标批量设置参数，每个参数只有一次原生调用，没有字符串查找
+        :param indices: 参数下标序列（list 或 numpy 数组，见 param_index）
+        :param values: 参数值序列
+        :param weights: 权重序列，None 表示全部为 1.0
+        """
+        if not self.model:
+            return
+        indices = indices.tolist() if hasattr(indices, "tolist") else indices
+        values = values.tolist() if hasattr(values, "tolist") else values
+        if weights is None:
+            weights = [1.0] * len(indices)
+        elif hasattr(weights, "tolist"):
+            weights = weights.tolist()
+        set_value = self.model.SetIndexParamValue
+        for index, value, weight in zip(indices, values, weights):
+            set_value(index, value, weight)
     
     def SetMouthOpenValue(self, value: float, weight: float = 1.0) -> None:
         if self.model:
-            self.model.SetParameterValue("ParamMouthOpenY", value, weight)
+            self.SetParameterValue(self.MOUTH_PARAM, value, weight)
 
     def GetParameterValue(self, paramId: str | int) -> float:
         if self.model:
             if isinstance(paramId, int):
                 return self.model.GetParameterValue(paramId)
-            ids = self.model.GetParamIds()
-            if paramId in ids:
-                index = ids.index(paramId)
+            index = self.param_index.get(paramId)
+            if index is not None:
                 return self.model.GetParameterValue(index)
         return 0.0
 
@@ -165,15 +432,9 @@ class Live2dModel():
         :param expression_name: 表情名称
         """
         try:
-            if cmd_name not in self.expression_projection.keys() and cmd_name not in self.expression_projection.values():
-                raise ValueError(f"表情名称 {cmd_name} 不存在于模型配置中")
-            if cmd_name in self.expression_projection.values():
-                # already an expression name
-                expression_name = cmd_name
-            else:
-                expression_name = self.expression_projection.get(cmd_name, None)
-            if expression_name not in self.expression_list:
-                raise ValueError(f"表情名称 {cmd_name} 未映射到具体表情ID")
+            expression_name = self.cmd_to_expression.get(cmd_name)
+            if expression_name is None:
+                raise ValueError(f"表情名称 {cmd_name} 不存在于模型配置中或未映射到具体表情ID")
             self.SetExpression(expression_name)
         except Exception as e:
             self.logger.error(f"设置表情失败: {e}")
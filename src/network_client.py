@@ -1,4 +1,4 @@
-import requests
+# requests 导入较慢，在各方法首次发起请求时才导入
 from typing import Tuple, List, Dict
 from .types import ConversationItem
 from .utils.logger import get_logger
@@ -27,6 +27,7 @@ class NetworkClient:
             if not encrypted_password:
                 return False, "Failed to encrypt password. Check server connection."
                 
+            import requests
             resp = requests.post(f"{self.base_url}/auth/login", json={
                 "username": username, 
                 "password": encrypted_password,
@@ -54,6 +55,7 @@ class NetworkClient:
 
     def auto_login(self, username: str, token: str) -> bool:
         try:
+            import requests
             resp = requests.post(f"{self.base_url}/auth/auto_login", json={"username": username, "token": token}, verify=False)
             if resp.status_code == 200:
                 data = resp.json()
@@ -73,6 +75,7 @@ class NetworkClient:
             if not encrypted_password:
                 return False, "Failed to encrypt password. Check server connection."
 
+            import requests
             resp = requests.post(f"{self.base_url}/auth/register", 
                                  json={"username": username, "password": encrypted_password, "invite_code": invite_code}, verify=False)
             if resp.status_code == 200:
@@ -94,6 +97,7 @@ class NetworkClient:
         try:
             payload = {"text": text, "username": self.user_id, "token": self.message_token}
             # Use stream=True for SSE
+            import requests
             with requests.post(f"{self.base_url}/chat", json=payload, stream=True, verify=False) as resp:
                 if resp.status_code == 200:
                     for line in resp.iter_lines():
@@ -120,6 +124,7 @@ class NetworkClient:
             
         try:
             params = {"username": self.user_id, "token": self.message_token, "count": count, "end_index": end_index}
+            import requests
             resp = requests.get(f"{self.base_url}/history", params=params, verify=False)
             if resp.status_code == 200:
                 data = resp.json()
@@ -170,6 +175,7 @@ class NetworkClient:
                 "image_client_path": new_file_path # send the new file path to server   
             }
             # Use stream=True for SSE
+            import requests
             with requests.post(f"{self.base_url}/picture_chat", data=data, files=files, stream=True, verify=False) as resp:
                 if resp.status_code == 200:
                     for line in resp.iter_lines():
@@ -1,16 +1,18 @@
-import requests
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
 import base64
+from typing import Any
 from ..utils.logger import get_logger
 
+# requests 和 cryptography 都只在需要密码登录/注册时才导入，不拖慢启动
+
 logger = get_logger("password")
-public_key : serialization.PublicFormat | None = None
-def get_public_key(base_url="http://127.0.0.1:8000") -> serialization.PublicFormat | None:
+public_key : Any | None = None
+def get_public_key(base_url="http://127.0.0.1:8000") -> Any | None:
     global public_key
     if public_key:
         return public_key
     try:
+        import requests
+        from cryptography.hazmat.primitives import serialization
         resp = requests.get(f"{base_url}/auth/public_key", verify=False)
         if resp.status_code == 200:
             pem = resp.json().get("public_key")
@@ -25,6 +27,8 @@ def encrypt_password(password: str, base_url="http://127.0.0.1:8000") -> str | N
     if not key:
         return None
     try:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
         encrypted = key.encrypt(
             password.encode('utf-8'),
             padding.OAEP(
@@ -0,0 +1,94 @@
+"""
+启动流程编排
+
+把互不依赖的 I/O 启动步骤（自动登录、公钥预取、Live2D 资源预加载、本地历史缓存读取）
+放到线程池中并行执行，并记录每个阶段的开始/结束时间。原生模块的导入和初始化留在主线程。
+使用 --startup-trace 启动时在窗口显示后输出时间线；导入耗时统计见 import_profiler。
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .utils.logger import get_logger
+
+
+class StartupTrace:
+    """记录启动各阶段相对于进程启动的时间"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.logger = get_logger(self.__class__.__name__)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def record(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self.stages.append({
+                "name": name,
+                "thread": threading.current_thread().name,
+                "start_ms": (start - self.origin) * 1000,
+                "end_ms": (end - self.origin) * 1000,
+            })
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def report(self, width: int = 40) -> str:
+        """
+        按开始时间排序的时间线，每行一个阶段，末尾的条形图表示阶段在整个启动过程中的位置
+        """
+        with self._lock:
+            stages = sorted(self.stages, key=lambda item: item["start_ms"])
+        if not stages:
+            return ""
+        total = max(item["end_ms"] for item in stages) or 1.0
+        name_width = max(len(item["name"]) for item in stages)
+        lines = [f"Startup timeline ({total:.1f} ms):"]
+        for item in stages:
+            begin = min(int(item["start_ms"] / total * width), width - 1)
+            end = max(begin + 1, int(item["end_ms"] / total * width))
+            bar = " " * begin + "#" * (end - begin)
+            lines.append(
+                f"  {item['name']:<{name_width}}  {item['start_ms']:8.1f} -> {item['end_ms']:8.1f} ms"
+                f"  ({item['end_ms'] - item['start_ms']:7.1f} ms)  [{bar:<{width}}]  {item['thread']}"
+            )
+        return "\n".join(lines)
+
+    def print_report(self) -> None:
+        if self.enabled:
+            print(self.report())
+
+
+class StartupOrchestrator:
+    """在线程池中并行执行启动步骤，每个步骤都记入 StartupTrace"""
+
+    def __init__(self, trace: Optional[StartupTrace] = None, max_workers: int = 4):
+        self.trace = trace or StartupTrace()
+        self.logger = get_logger(self.__class__.__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        def run():
+            with self.trace.stage(name):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    self.logger.error(f"Startup stage {name} failed: {e}")
+                    raise
+        return self._executor.submit(run)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,179 @@
+"""
+TTS 音频本地缓存
+
+以回复内容的哈希为键，将每句回复的音频压缩为 FLAC 保存在磁盘上，
+从历史记录重播语音时直接读取本地文件，无需再次请求服务器合成。
+每个音频旁边附带一个口型包络文件 (.env.npy, float16)，读取时以内存映射方式
+加载，口型驱动无需再分析音频。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from .audio_processor import compute_mouth_envelope, decode_stream_chunks
+from .helpers import calculate_hash
+from .logger import get_logger
+
+logger = get_logger("audio_cache")
+
+
+class AudioCache:
+    """有容量上限的磁盘音频缓存，按最近使用时间 (LRU) 淘汰"""
+
+    AUDIO_SUFFIX = ".flac"
+    ENVELOPE_SUFFIX = ".env.npy"
+    ENVELOPE_FPS = 60
+
+    def __init__(self, cache_dir: str = "temp/audio_cache", max_size_mb: float = 200):
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # key -> 文件大小，顺序即 LRU 顺序（末尾为最近使用）
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_size = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return calculate_hash(text.strip(), algorithm="sha1")
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.AUDIO_SUFFIX)
+
+    def envelope_path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.ENVELOPE_SUFFIX)
+
+    def contains(self, text: str) -> bool:
+        if not text or not text.strip():
+            return False
+        with self._lock:
+            return self.make_key(text) in self._index
+
+    def lookup(self, text: str) -> Optional[str]:
+        """
+        查找文本对应的缓存音频，命中时刷新其 LRU 位置
+        :return: 音频文件路径，未命中返回 None
+        """
+        if not text or not text.strip():
+            return None
+        key = self.make_key(text)
+        path = self.path_for(key)
+        with self._lock:
+            if key not in self._index:
+                return None
+            if not os.path.exists(path):
+                self._total_size -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+        try:
+            # 用修改时间记录最近使用，下次启动时据此恢复 LRU 顺序
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def put(self, text: str, chunks: List[bytes]) -> Optional[str]:
+        """
+        保存一句回复的音频
+        :param text: 回复文本
+        :param chunks: 流式音频分片，第一片带音频头，其余为裸 PCM
+        :return: 缓存文件路径，失败返回 None
+        """
+        if not text or not text.strip() or not chunks:
+            return None
+        key = self.make_key(text)
+        path = self.path_for(key)
+        tmp_path = path + ".tmp"
+        try:
+            samples, samplerate, _ = decode_stream_chunks(chunks)
+            if len(samples) == 0:
+                return None
+            import soundfile as sf
+            sf.write(tmp_path, samples, samplerate, format="FLAC", subtype="PCM_16")
+            os.replace(tmp_path, path)
+            self._write_envelope(key, samples, samplerate)
+        except Exception as e:
+            logger.error(f"Failed to cache audio: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        size = self._entry_size(key)
+        with self._lock:
+            if key in self._index:
+                self._total_size -= self._index.pop(key)
+            self._index[key] = size
+            self._total_size += size
+            self._evict()
+        return path
+
+    def load_envelope(self, text: str) -> Optional[np.ndarray]:
+        """
+        读取文本对应音频的口型包络（ENVELOPE_FPS 帧每秒）。
+        包络以内存映射方式打开，长歌曲也只占用常量内存；旧缓存缺少包络时补算一次。
+        :return: 只读的包络数组，未命中返回 None
+        """
+        path = self.lookup(text)
+        if not path:
+            return None
+        key = self.make_key(text)
+        envelope_path = self.envelope_path_for(key)
+        try:
+            if not os.path.exists(envelope_path):
+                import soundfile as sf
+                samples, samplerate = sf.read(path, dtype="int16")
+                self._write_envelope(key, samples, samplerate)
+            return np.load(envelope_path, mmap_mode="r")
+        except Exception as e:
+            logger.error(f"Failed to load mouth envelope: {e}")
+            return None
+
+    def _write_envelope(self, key: str, samples: np.ndarray, samplerate: int) -> None:
+        envelope = compute_mouth_envelope(samples, samplerate, fps=self.ENVELOPE_FPS).astype(np.float16)
+        envelope_path = self.envelope_path_for(key)
+        # np.save 会自动补 .npy 后缀，临时文件名需以 .npy 结尾
+        tmp_path = envelope_path[: -len(".npy")] + ".tmp.npy"
+        np.save(tmp_path, envelope)
+        os.replace(tmp_path, envelope_path)
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for path in (self.path_for(key), self.envelope_path_for(key)):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def _scan(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.AUDIO_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = name[: -len(self.AUDIO_SUFFIX)]
+            entries.append((stat.st_mtime, key, self._entry_size(key)))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_size += size
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        # 调用方需持有 self._lock
+        while self._total_size > self.max_size and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_size -= size
+            for path in (self.path_for(key), self.envelope_path_for(key)):
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Failed to evict cached audio {key}: {e}")
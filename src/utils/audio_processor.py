@@ -1,12 +1,13 @@
-import soundfile as sf
 import numpy as np
-import winsound
 import base64
 from .logger import get_logger
 import io
 import os
 from datetime import datetime
 import time
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Tuple
 
 logger = get_logger("audio_processor")
 
@@ -23,6 +24,7 @@ def extract_audio_amplitude(wav: str | bytes, fps: int = 30) -> np.ndarray:
     """
     # 加载音频，sr=None 保持原始采样率
     try:
+        import soundfile as sf  # 首次处理音频时才加载 libsndfile
         if isinstance(wav, bytes):
             # soundfile.read supports file-like objects
             y, sr = sf.read(io.BytesIO(wav))
@@ -107,60 +109,160 @@ def save_to_wav(wav_data: bytes) -> str:
     logger.info(f"Saved WAV file to {output_path}")
     return output_path
 
-HAS_WINSOUND = True
+# 流式 PCM 分片的 soundfile subtype -> numpy dtype 映射
+# PCM_24 没有对应的 numpy 类型，解码为高位对齐的 int32，写入输出流和裸分片中仍是 3 字节一个采样
+_STREAM_DTYPES = {
+    "PCM_16": "int16",
+    "PCM_24": "int32",
+    "PCM_32": "int32",
+    "FLOAT": "float32",
+}
+
+# 裸 PCM 分片和输出流中每个采样占用的字节数
+_SAMPLE_WIDTHS = {
+    "PCM_16": 2,
+    "PCM_24": 3,
+    "PCM_32": 4,
+    "FLOAT": 4,
+}
+
+def get_stream_dtype(subtype: str | None) -> str:
+    return _STREAM_DTYPES.get(subtype, "int16")
+
+def get_sample_width(subtype: str | None) -> int:
+    return _SAMPLE_WIDTHS.get(subtype, 2)
+
+def decode_stream_pcm(data: bytes, subtype: str | None) -> np.ndarray:
+    """
+    把裸 PCM 分片转换为采样数组（一维，多声道交错），不完整的末尾采样被丢弃
+    """
+    width = get_sample_width(subtype)
+    data = data[:len(data) - len(data) % width]
+    if subtype == "PCM_24":
+        # 小端 3 字节补到 int32 的高 3 字节，与 soundfile 读取 PCM_24 的结果一致
+        packed = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(packed), 4), dtype=np.uint8)
+        padded[:, 1:] = packed
+        return padded.view("<i4").ravel()
+    return np.frombuffer(data, dtype=get_stream_dtype(subtype))
+
+def encode_stream_pcm(samples: np.ndarray, subtype: str | None) -> bytes:
+    """
+    把 soundfile 解码出的采样数组转换为输出流格式的字节，decode_stream_pcm 的逆操作
+    """
+    if subtype == "PCM_24":
+        return np.ascontiguousarray(samples, dtype="<i4").view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+    return samples.tobytes()
 
 class AudioPlayerStream:
     """
     流式音频播放器。
     类似于 Web 端的 MSE (MediaSource Extensions)，支持 appendBuffer。
+
+    一轮回复由多个句子组成。句子按顺序进入播放队列，由独立的播放线程写入输出流：
+    当前句子播放时，后续句子可以继续 append 并完成解码排队；格式相同的句子共用
+    同一个输出流首尾相接，句子之间不再重新解析头部、重新打开设备或等待输出延迟。
+
+    PyAudio 的初始化（枚举设备）放在播放线程开头进行，构造函数立即返回；
+    初始化期间到达的分片照常解码排队，设备就绪后开始播放。
+
+    PCM 按 WRITE_FRAMES 帧分块写入输出流，每写完一块记录一次进度，
+    health() 据此报告播放线程是否卡住，以及欠载、丢弃分片等计数。
     """
-    def __init__(self):
-        try:
-            import pyaudio
-            self.p = pyaudio.PyAudio()
-            self.has_pyaudio = True
-        except ImportError:
-            logger.error("PyAudio not installed. Streaming not supported properly.")
-            self.has_pyaudio = False
-            self.p = None
-            
+
+    WRITE_FRAMES = 2048
+    FILE_BLOCK_FRAMES = 16384
+
+    def __init__(self, event_callback: Callable[[Dict[str, Any]], None] | None = None,
+                 on_device_ready: Callable[[float, bool], None] | None = None):
+        self.p = None
+        self.has_pyaudio = True  # 设备初始化完成前先假定可用，失败后再改为 False
+        self._device_ready = threading.Event()
+        self.on_device_ready = on_device_ready
+
+        # 健康状况，由播放进程的心跳线程读取
+        self.underruns = 0
+        self.dropped_chunks = 0
+        self.errors = 0
+        self._busy = False
+        self._progress = time.monotonic()
+
         self.stream = None
+        self.stream_format: Tuple[str | None, int, int] | None = None # (subtype, channels, rate)
         self.header_parsed = False
         self.samplerate = 0
         self.channels = 0
         self.subtype = None # e.g. 'PCM_16'
-        self.buffer = io.BytesIO() # buffer for first chunk if needed
+        self.sentence_id = None
+        self.event_callback = event_callback
+
+        # 播放队列中的元素: ("start", sentence_id) / ("pcm", bytes, format) / ("end", sentence_id) / ("drain", token)
+        self._play_queue: queue.Queue = queue.Queue()
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._play_thread.start()
+
+    def begin_sentence(self, sentence_id: int | None = None):
+        """
+        开始一个新句子。句子的第一个分片带有音频头，后续分片为裸 PCM。
+        """
+        self.sentence_id = sentence_id
+        self.header_parsed = False
+        self._play_queue.put(("start", sentence_id))
+
+    def end_sentence(self):
+        self._play_queue.put(("end", self.sentence_id))
+        self.sentence_id = None
 
     def append_buffer(self, data: bytes):
-        if not self.has_pyaudio:
+        if self._device_ready.is_set() and not self.has_pyaudio:
             return
 
         if not self.header_parsed:
             # Attempt to parse header from this chunk (assuming it's the first or start of stream)
             # We use soundfile to detect format
             try:
+                import soundfile as sf
                 with sf.SoundFile(io.BytesIO(data)) as f:
                     self.samplerate = f.samplerate
                     self.channels = f.channels
                     self.subtype = f.subtype
-                    initial_audio = f.read(dtype='int16') # Read as int16 for direct output if possible?
-
-                    format_pyaudio = self._get_pyaudio_format(self.subtype)
-                    
-                    self.stream = self.p.open(format=format_pyaudio,
-                                              channels=self.channels,
-                                              rate=self.samplerate,
-                                              output=True)
-                
-                    
-                    raw_bytes = initial_audio.tobytes()
-                    self.stream.write(raw_bytes)
-                    self.header_parsed = True
+                    dtype = get_stream_dtype(self.subtype)
+                    initial_audio = f.read(dtype=dtype)
+                self.header_parsed = True
+                self._play_queue.put(("pcm", encode_stream_pcm(initial_audio, self.subtype), self._current_format()))
             except Exception as e:
                 logger.error(f"Failed to parse header from first chunk: {e}")
-                pass
+                self.dropped_chunks += 1
         else:
-            self.stream.write(data)
+            self._play_queue.put(("pcm", data, self._current_format()))
+
+    def append_file(self, path: str):
+        """
+        整段播放一个本地音频文件（例如缓存的 FLAC）。按 FILE_BLOCK_FRAMES 帧分块解码，
+        每解码一块就排入播放队列，第一块就绪即可开始播放，不必先解码整个文件
+        """
+        if self._device_ready.is_set() and not self.has_pyaudio:
+            return
+        try:
+            import soundfile as sf
+            with sf.SoundFile(path) as f:
+                self.samplerate = f.samplerate
+                self.channels = f.channels
+                self.subtype = f.subtype
+                self.header_parsed = True
+                dtype = get_stream_dtype(self.subtype)
+                stream_format = self._current_format()
+                for block in f.blocks(blocksize=self.FILE_BLOCK_FRAMES, dtype=dtype):
+                    self._play_queue.put(("pcm", encode_stream_pcm(block, self.subtype), stream_format))
+        except Exception as e:
+            logger.error(f"Failed to decode audio file {path}: {e}")
+            self.dropped_chunks += 1
+
+    def drain(self, token: Any = None):
+        """
+        在队列末尾放置一个标记，之前的句子全部播放完毕后回调 {"event": "drained", "token": token}。
+        """
+        self._play_queue.put(("drain", token))
 
     def wait_until_empty(self):
         # PyAudio 的 write 是阻塞的，但数据写入后到声音从扬声器出来有延迟 (Latency)。
@@ -175,6 +277,108 @@ class AudioPlayerStream:
             except Exception:
                 time.sleep(0.05)
 
+    def health(self) -> Dict[str, Any]:
+        """
+        stall_s 为播放线程在当前任务（设备初始化或写入一块 PCM）上停留的秒数，空闲时为 0
+        """
+        return {
+            "device_ready": self._device_ready.is_set(),
+            "has_pyaudio": self.has_pyaudio,
+            "stall_s": round(time.monotonic() - self._progress, 2) if self._busy else 0.0,
+            "play_queue_depth": self._play_queue.qsize(),
+            "underruns": self.underruns,
+            "dropped_chunks": self.dropped_chunks,
+            "errors": self.errors,
+        }
+
+    def _current_format(self) -> Tuple[str | None, int, int]:
+        return (self.subtype, self.channels, self.samplerate)
+
+    def _init_device(self):
+        start = time.perf_counter()
+        self._busy, self._progress = True, time.monotonic()
+        try:
+            import pyaudio
+            self.p = pyaudio.PyAudio()
+        except ImportError:
+            logger.error("PyAudio not installed. Streaming not supported properly.")
+            self.has_pyaudio = False
+        except Exception as e:
+            logger.error(f"PyAudio init failed: {e}")
+            self.has_pyaudio = False
+        self._busy = False
+        self._device_ready.set()
+        if self.on_device_ready:
+            try:
+                self.on_device_ready((time.perf_counter() - start) * 1000, self.has_pyaudio)
+            except Exception as e:
+                logger.error(f"Audio ready callback error: {e}")
+
+    def _emit(self, event: Dict[str, Any]):
+        if self.event_callback:
+            try:
+                self.event_callback(event)
+            except Exception as e:
+                logger.error(f"Audio event callback error: {e}")
+
+    def _ensure_stream(self, stream_format: Tuple[int, int, int]):
+        if self.stream and self.stream_format == stream_format:
+            return
+        if self.stream:
+            # 格式变化时才需要重新打开，先让旧流把尾音放完
+            self.wait_until_empty()
+            self.stream.stop_stream()
+            self.stream.close()
+        subtype, channels, rate = stream_format
+        self.stream = self.p.open(format=self._get_pyaudio_format(subtype),
+                                  channels=channels,
+                                  rate=rate,
+                                  output=True)
+        self.stream_format = stream_format
+
+    def _play_loop(self):
+        self._init_device()
+        while True:
+            item = self._play_queue.get()
+            if item is None:
+                break
+            kind = item[0]
+            try:
+                if kind == "pcm":
+                    if not self.has_pyaudio:
+                        continue
+                    self._write_pcm(item[1], item[2])
+                elif kind == "start":
+                    self._emit({"event": "started", "sentence_id": item[1]})
+                elif kind == "end":
+                    self._emit({"event": "finished", "sentence_id": item[1]})
+                elif kind == "drain":
+                    self.wait_until_empty()
+                    self._emit({"event": "drained", "token": item[1]})
+            except Exception as e:
+                self.errors += 1
+                if kind == "pcm":
+                    self.dropped_chunks += 1
+                logger.error(f"Audio playback error: {e}")
+            finally:
+                self._busy = False
+
+    def _write_pcm(self, data: bytes, stream_format: Tuple[str | None, int, int]):
+        import pyaudio
+        self._busy, self._progress = True, time.monotonic()
+        self._ensure_stream(stream_format)
+        subtype, channels, _ = stream_format
+        block = self.WRITE_FRAMES * max(channels, 1) * get_sample_width(subtype)
+        for offset in range(0, len(data), block):
+            try:
+                self.stream.write(data[offset:offset + block], exception_on_underflow=True)
+            except OSError as e:
+                # 欠载时数据已经写入，只是输出出现了断续，计数后继续
+                if pyaudio.paOutputUnderflowed not in e.args:
+                    raise
+                self.underruns += 1
+            self._progress = time.monotonic()
+
     def _get_pyaudio_format(self, subtype):
         import pyaudio
         if subtype == 'PCM_16':
@@ -188,6 +392,8 @@ class AudioPlayerStream:
         return pyaudio.paInt16 # Default
 
     def close(self):
+        self._play_queue.put(None)
+        self._play_thread.join(timeout=5.0)
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
@@ -200,15 +406,8 @@ def calculate_amplitude_from_chunk(data: bytes, samplerate: int, channels: int,
     """
     Calculate amplitude for a raw PCM chunk
     """
-    # Map subtype to dtype
-    dtype = 'int16'
-    if subtype == 'FLOAT':
-        dtype = 'float32'
-    elif subtype == 'PCM_32':
-        dtype = 'int32'
-    
     try:
-        y = np.frombuffer(data, dtype=dtype)
+        y = decode_stream_pcm(data, subtype)
     except ValueError:
         return np.array([0.0]) # Buffer size mismatch?
         
@@ -216,14 +415,31 @@ def calculate_amplitude_from_chunk(data: bytes, samplerate: int, channels: int,
         # Reshape to (N, channels)
         try:
             y = y.reshape(-1, channels)
-            y = np.mean(y, axis=1)
         except:
              pass
 
+    return compute_mouth_envelope(y, samplerate, fps=fps)
+
+def compute_mouth_envelope(samples: np.ndarray, samplerate: int, fps: int = 60) -> np.ndarray:
+    """
+    计算用于口型同步的振幅包络。
+
+    Args:
+        samples: 采样数组，整型或浮点，多声道时形状为 (N, channels)
+        samplerate: 采样率
+        fps: 每秒输出的包络帧数
+
+    Returns:
+        numpy.ndarray: 口型参数值，范围 [-1, 1]
+    """
+    y = samples
+    if y.ndim > 1:
+        y = np.mean(y, axis=1)
+
     # Normalize to -1..1 for calculation if it is int
-    if dtype == 'int16':
+    if samples.dtype == np.int16:
         y = y / 32768.0
-    elif dtype == 'int32':
+    elif samples.dtype == np.int32:
         y = y / 2147483648.0
         
     # Same RMS logic as extract_audio_amplitude
@@ -245,6 +461,32 @@ def calculate_amplitude_from_chunk(data: bytes, samplerate: int, channels: int,
     rms = np.clip(rms * 5 - 1, -1, 1) # simple scaling
     return rms
 
+def decode_stream_chunks(chunks: List[bytes]) -> Tuple[np.ndarray, int, str]:
+    """
+    将一句回复的流式分片拼接解码为完整的采样数组。
+
+    Args:
+        chunks: 流式音频分片，第一片带音频头，其余为裸 PCM
+
+    Returns:
+        (samples, samplerate, subtype)，多声道时 samples 形状为 (N, channels)
+    """
+    import soundfile as sf
+    with sf.SoundFile(io.BytesIO(chunks[0])) as f:
+        samplerate = f.samplerate
+        channels = f.channels
+        subtype = f.subtype
+        dtype = get_stream_dtype(subtype)
+        head = f.read(dtype=dtype)
+
+    raw = b"".join(chunks[1:])
+    frame_size = get_sample_width(subtype) * channels
+    usable = len(raw) - len(raw) % frame_size
+    tail = decode_stream_pcm(raw[:usable], subtype)
+    if channels > 1:
+        tail = tail.reshape(-1, channels)
+    return np.concatenate([head, tail]), samplerate, subtype
+
 def play_audio(wav_data: bytes):
     """
     播放音频数据的函数占位符。
@@ -253,7 +495,11 @@ def play_audio(wav_data: bytes):
     Args:
         wav_data: 音频数据的字节流
     """
-    if HAS_WINSOUND:
+    try:
+        import winsound
+    except ImportError:
+        winsound = None
+    if winsound is not None:
         try:
             # winsound.SND_MEMORY 指示第一个参数是内存中的数据
             # winsound.SND_NODEFAULT 如果找不到声音，不播放系统默认声音
@@ -0,0 +1,271 @@
+"""
+音频播放子进程
+
+子进程以 spawn 方式启动时会重新导入目标函数所在的模块，因此本模块只依赖标准库和日志，
+NumPy、soundfile、PyAudio 都在子进程内部按需导入。PyAudio 的设备初始化在播放线程中
+进行，命令循环启动后即可开始接收和解码分片；设备就绪后通过 queue_out 回传
+{"event": "ready"}，父进程据此得知播放进程已经预热完成。
+
+子进程另有一个心跳线程定期回传 {"event": "heartbeat"} 和播放器的健康状况。
+父进程的 AudioWorker 据此判断子进程是否退出、失联或卡在设备调用中，
+需要时结束旧进程并换用新的进程和队列（restart）。
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .logger import get_logger
+
+# 跨进程累计的计数器
+_COUNTERS = ("underruns", "dropped_chunks", "errors")
+
+
+def run_audio_player_worker(queue_in: multiprocessing.Queue, queue_out: multiprocessing.Queue, spawn_time: float | None = None,
+                            heartbeat_interval: float = 1.0):
+    """
+    Worker process for audio playback to avoid GIL contention.
+
+    命令按句子组织：begin -> append* -> end。播放在进程内的播放线程中进行，
+    因此当前句子播放时，后续句子的分片可以继续被接收和解码。
+    播放事件 (ready / heartbeat / started / finished / drained) 通过 queue_out 回传。
+    """
+    from .audio_processor import AudioPlayerStream
+    logger = get_logger("audio_worker")
+
+    def on_device_ready(device_ms: float, has_pyaudio: bool):
+        queue_out.put({
+            "event": "ready",
+            "pid": os.getpid(),
+            "has_pyaudio": has_pyaudio,
+            "device_ms": round(device_ms, 1),
+            # time.time() 跨进程可比，用于估算子进程从启动到就绪的总耗时
+            "startup_ms": round((time.time() - spawn_time) * 1000, 1) if spawn_time else None,
+        })
+
+    player = AudioPlayerStream(event_callback=queue_out.put if queue_out else None, on_device_ready=on_device_ready)
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(heartbeat_interval):
+            queue_out.put({"event": "heartbeat", **player.health()})
+
+    threading.Thread(target=heartbeat, name="audio-heartbeat", daemon=True).start()
+
+    while True:
+        try:
+            task = queue_in.get()
+            if task is None:
+                break
+
+            cmd = task.get("cmd")
+            if cmd == "begin":
+                player.begin_sentence(task.get("sentence_id"))
+
+            elif cmd == "append":
+                data = task.get("data")
+                if data:
+                    player.append_buffer(data)
+
+            elif cmd == "append_file":
+                player.append_file(task.get("path"))
+
+            elif cmd == "end":
+                player.end_sentence()
+
+            elif cmd == "wait_finish":
+                player.drain(task.get("token"))
+
+        except Exception as e:
+            player.errors += 1
+            logger.error(f"Audio worker error: {e}")
+
+    stopped.set()
+    player.close()
+
+
+class AudioWorker:
+    """
+    播放子进程及其命令/事件队列。
+
+    可以在 AgentBinder 创建之前单独启动（例如与登录并行），让子进程的启动和导入
+    与其他启动步骤重叠。start() 只负责拉起进程、不等待子进程导入或设备初始化；
+    在此期间发送的命令会在队列中排队，子进程就绪后按顺序处理；发送方通过 note_command
+    登记命令，设备就绪之前就开始的句子会在就绪时报告它因预热多等了多久。
+
+    读取 queue_out 的一方把心跳交给 on_heartbeat，并定期调用 check_health；
+    返回非空原因时调用 restart 换用新进程。queue_in / queue_out 在重启后是新的队列，
+    使用方每次都应通过本对象取用，不要缓存。
+
+    stop() 之后进入停止状态：check_health 不再报告故障，restart 拒绝执行，
+    并向 queue_out 放入 None，读取事件的一方收到后退出。
+    """
+
+    def __init__(self, config: Dict[str, Any] | None = None):
+        config = config or {}
+        self.logger = get_logger(self.__class__.__name__)
+        self.heartbeat_interval: float = config.get("heartbeat_interval", 1.0)
+        self.heartbeat_timeout: float = config.get("heartbeat_timeout", 5.0)
+        # 第一次心跳要等子进程完成导入，冻结程序在 Windows 上可能需要数秒
+        self.startup_timeout: float = config.get("startup_timeout", 20.0)
+        self.stall_timeout: float = config.get("stall_timeout", 10.0)
+        self.restart_cooldown: float = config.get("restart_cooldown", 2.0)
+        self.queue_in: multiprocessing.Queue = multiprocessing.Queue()
+        self.queue_out: multiprocessing.Queue = multiprocessing.Queue()
+        self.process: Optional[multiprocessing.Process] = None
+        self.ready_info: Dict[str, Any] = {}
+        self._ready = threading.Event()
+        # note_command 在 scheduler 线程、mark_ready 在 audio-events 线程中调用
+        self._ready_lock = threading.Lock()
+        self._first_begin_before_ready: float | None = None  # 就绪之前发出第一句的时刻
+        self.first_sentence_wait_ms: float | None = None
+
+        self.restarts: int = 0
+        self.last_restart_reason: str | None = None
+        self.last_restart_time: float = 0.0
+        self.dropped_chunks: int = 0  # 父进程在重启时丢弃的分片
+        self._health: Dict[str, Any] = {}  # 当前进程最近一次心跳
+        self._totals: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)  # 已结束的进程累计的计数
+        self._spawned_at: float = 0.0
+        self._last_heartbeat: float | None = None
+        self._stopping: bool = False
+
+    def start(self) -> "AudioWorker":
+        self.process = multiprocessing.Process(
+            target=run_audio_player_worker,
+            args=(self.queue_in, self.queue_out, time.time(), self.heartbeat_interval),
+            name="audio-player",
+            daemon=True
+        )
+        self._spawned_at = time.monotonic()
+        self._last_heartbeat = None
+        self.process.start()
+        return self
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def is_stopping(self) -> bool:
+        return self._stopping
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def note_command(self, command: Dict[str, Any]) -> None:
+        """
+        发送方每发出一条命令调用一次；只关心设备就绪之前发出的第一句
+        """
+        if command.get("cmd") != "begin" or self._ready.is_set():
+            return
+        with self._ready_lock:
+            if self._first_begin_before_ready is not None or self._ready.is_set():
+                return
+            self._first_begin_before_ready = time.monotonic()
+        self.logger.info(f"Sentence {command.get('sentence_id')} sent before the audio device is ready, "
+                         f"playback starts after device init")
+
+    def mark_ready(self, event: Dict[str, Any]) -> None:
+        """
+        ready 事件由读取 queue_out 的一方转交
+        """
+        self.ready_info = event
+        with self._ready_lock:
+            self._ready.set()
+            waiting_since, self._first_begin_before_ready = self._first_begin_before_ready, None
+        self.logger.info(
+            f"Audio worker {event.get('pid')} ready: device init {event.get('device_ms')} ms, "
+            f"since spawn {event.get('startup_ms')} ms, pyaudio={event.get('has_pyaudio')}"
+        )
+        if waiting_since is not None:
+            self.first_sentence_wait_ms = round((time.monotonic() - waiting_since) * 1000, 1)
+            self.logger.info(f"First sentence waited {self.first_sentence_wait_ms} ms for the audio device")
+
+    def on_heartbeat(self, event: Dict[str, Any]) -> None:
+        self._health = event
+        self._last_heartbeat = time.monotonic()
+
+    def check_health(self) -> str | None:
+        """
+        :return: 需要重启的原因；健康或正在停止时返回 None
+        """
+        if self.process is None or self._stopping:
+            return None
+        if not self.process.is_alive():
+            return f"process exited with code {self.process.exitcode}"
+        now = time.monotonic()
+        if self._last_heartbeat is None:
+            if now - self._spawned_at > self.startup_timeout:
+                return f"no heartbeat within {self.startup_timeout:.0f}s of spawn"
+            return None
+        if now - self._last_heartbeat > self.heartbeat_timeout:
+            return f"heartbeat lost for {now - self._last_heartbeat:.1f}s"
+        if self._health.get("stall_s", 0) > self.stall_timeout:
+            return f"playback stalled for {self._health['stall_s']:.1f}s"
+        return None
+
+    def restart(self, reason: str) -> bool:
+        """
+        结束当前子进程，换用新的队列启动一个新进程；调用方负责重新发送未完成的命令
+        :return: 已调用 stop() 时不再重启，返回 False
+        """
+        if self._stopping:
+            self.logger.info(f"Audio worker is stopping, not restarting: {reason}")
+            return False
+        self.logger.warning(f"Restarting audio worker: {reason}")
+        for key in _COUNTERS:
+            self._totals[key] += self._health.get(key, 0)
+        self._health = {}
+        with self._ready_lock:
+            self._ready.clear()
+            self._first_begin_before_ready = None
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        for q in (self.queue_in, self.queue_out):
+            # 旧进程可能死在持有队列锁的时刻，直接丢弃旧队列，退出时也不等待其缓冲
+            q.cancel_join_thread()
+            q.close()
+        self.queue_in = multiprocessing.Queue()
+        self.queue_out = multiprocessing.Queue()
+        self.restarts += 1
+        self.last_restart_reason = reason
+        self.last_restart_time = time.monotonic()
+        self.start()
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        结束子进程。之后正常退出不会被当作故障重启，queue_out 的读取方收到 None 后退出
+        """
+        self._stopping = True
+        if self.process is not None:
+            try:
+                self.queue_in.put(None)
+            except Exception:
+                pass
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+        try:
+            self.queue_out.put(None)
+        except Exception:
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        heartbeat_age = None if self._last_heartbeat is None else round(time.monotonic() - self._last_heartbeat, 2)
+        return {
+            "alive": self.is_alive(),
+            "ready": self.is_ready(),
+            "first_sentence_wait_ms": self.first_sentence_wait_ms,
+            "pid": self.process.pid if self.process is not None else None,
+            "restarts": self.restarts,
+            "last_restart_reason": self.last_restart_reason,
+            "heartbeat_age_s": heartbeat_age,
+            "stall_s": self._health.get("stall_s", 0.0),
+            "underruns": self._totals["underruns"] + self._health.get("underruns", 0),
+            "dropped_chunks": self._totals["dropped_chunks"] + self._health.get("dropped_chunks", 0) + self.dropped_chunks,
+            "errors": self._totals["errors"] + self._health.get("errors", 0),
+        }
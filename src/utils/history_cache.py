@@ -0,0 +1,62 @@
+"""
+历史记录本地缓存
+
+按用户保存最近一页历史记录。启动时先显示缓存内容，服务器的结果到达后
+若有变化再替换，聊天窗口不必空着等待网络请求。
+"""
+
+import json
+import os
+from dataclasses import asdict
+from typing import List, Optional, Tuple
+
+from ..types import ConversationItem
+from .helpers import calculate_hash
+from .logger import get_logger
+
+logger = get_logger("history_cache")
+
+
+class HistoryCache:
+    """一个用户最近一页历史记录的磁盘缓存"""
+
+    def __init__(self, cache_dir: str = "temp/history_cache", user_id: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.user_id = user_id
+        # load() 读到、尚未被界面取走的缓存页
+        self.cached: Optional[Tuple[List[ConversationItem], int]] = None
+
+    def path(self) -> Optional[str]:
+        if not self.user_id:
+            return None
+        return os.path.join(self.cache_dir, calculate_hash(self.user_id, "sha1") + ".json")
+
+    def load(self) -> Optional[Tuple[List[ConversationItem], int]]:
+        path = self.path()
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.cached = [ConversationItem(**item) for item in data.get("history", [])], data.get("start_index", 0)
+        except Exception as e:
+            logger.warning(f"读取历史记录缓存失败: {e}")
+            self.cached = None
+        return self.cached
+
+    def take_cached(self) -> Optional[Tuple[List[ConversationItem], int]]:
+        cached, self.cached = self.cached, None
+        return cached
+
+    def save(self, history: List[ConversationItem], start_index: int) -> None:
+        path = self.path()
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"history": [asdict(item) for item in history], "start_index": start_index}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"保存历史记录缓存失败: {e}")
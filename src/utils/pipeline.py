@@ -0,0 +1,75 @@
+"""
+长期运行的流水线工作线程
+
+每个 PipelineWorker 持有一个有界队列和一个常驻线程，按提交顺序依次处理任务，
+替代每次调用都新建、销毁线程的做法，并提供队列深度等运行指标。
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .logger import get_logger
+
+_STOP = object()
+
+
+class PipelineWorker:
+    """从有界队列中依次取出任务交给 handler 处理的常驻线程"""
+
+    def __init__(self, name: str, handler: Callable[[Any], None], maxsize: int = 64):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.logger = get_logger(f"{self.__class__.__name__}.{name}")
+        self.processed: int = 0
+        self.errors: int = 0
+        self.rejected: int = 0
+        self._thread = threading.Thread(target=self._run, name=f"pipeline-{name}", daemon=True)
+
+    def start(self) -> "PipelineWorker":
+        self._thread.start()
+        return self
+
+    def submit(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        提交一个任务；队列已满时阻塞（背压），非阻塞或超时提交失败时返回 False
+        """
+        try:
+            self.queue.put(item, block=block, timeout=timeout)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.queue.put(_STOP)
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout=timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "alive": self.is_alive(),
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.maxsize,
+            "processed": self.processed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            try:
+                self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Pipeline task error: {e}")
+            finally:
+                self.processed += 1